@@ -1,15 +1,22 @@
 """
 Endpoint de classificação de fraude
 """
-from fastapi import APIRouter, HTTPException, Depends, status
+from fastapi import APIRouter, HTTPException, Depends, Header, Query, Response, status
 from pydantic import BaseModel, Field
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from datetime import datetime
+import hashlib
+import json
 import uuid
 import logging
 
 from app.ml.model_loader import model_loader
 from app.core.security import verify_api_key
+from app.core.feed import classification_feed
+from app.core.deadline import Deadline, DeadlineExceeded, deadline_metrics, get_request_deadline
+from app.core.idempotency import IdempotencyConflict, idempotency_store
+from app.core.config import settings
+from app.ml.inference_pool import inference_pool
 
 logger = logging.getLogger(__name__)
 
@@ -31,11 +38,27 @@ class ClassificationRequest(BaseModel):
     device_info: Optional[Dict[str, Any]] = None
     user_id: Optional[str] = None
     previous_transactions_count: Optional[int] = Field(default=0, ge=0)
+    client_transaction_id: Optional[str] = Field(
+        None, description="ID da transação no cliente; usado como chave de idempotência se não houver header"
+    )
 
 class ClassificationDetails(BaseModel):
     legitimate_probability: float
     fraud_probability: float
     risk_level: str
+    trees_used: Optional[int] = None  # Árvores avaliadas pela floresta
+    decided_by: Optional[str] = None  # Avaliador que decidiu: prefilter, forest, reduced_forest ou heuristic
+
+class FeatureContribution(BaseModel):
+    feature: str
+    value: float  # Valor da feature após o pré-processamento
+    contribution: float  # Efeito no fraud_score (positivo = aumenta o risco)
+
+class Explanation(BaseModel):
+    bias: float  # Score médio na raiz das árvores
+    contributions: List[FeatureContribution]
+    trees_used: int
+    complete: bool  # False se o limite de tempo cortou a explicação
 
 class ClassificationResponse(BaseModel):
     transaction_id: str
@@ -43,8 +66,100 @@ class ClassificationResponse(BaseModel):
     fraud_score: float  # 0.0 - 1.0
     confidence: str  # low, medium, high
     details: ClassificationDetails
+    degraded: bool = False  # True se o prazo forçou um avaliador mais barato
+    explanation: Optional[Explanation] = None  # Presente com explain=true
     timestamp: str
 
+def build_transaction_data(request: ClassificationRequest) -> Dict[str, Any]:
+    """Converte o request da API para o formato esperado pelo modelo"""
+    return {
+        'amount': request.amount,
+        'hour': request.hour,
+        'day_of_week': request.day_of_week,
+        'merchant_category': request.merchant_category,
+        'location': request.location.dict(),
+    }
+
+def build_classification_response(
+    result: Dict[str, Any],
+    transaction_id: Optional[str] = None
+) -> ClassificationResponse:
+    """Gera o ID da transação e monta a resposta a partir do resultado do modelo"""
+    # Gerar ID da transação
+    transaction_id = transaction_id or f"txn_{uuid.uuid4().hex[:12]}"
+    
+    return ClassificationResponse(
+        transaction_id=transaction_id,
+        classification=result['classification'],
+        fraud_score=result['fraud_score'],
+        confidence=result['confidence'],
+        details=ClassificationDetails(**result['details']),
+        degraded=result.get('degraded', False),
+        explanation=result.get('explanation'),
+        timestamp=datetime.utcnow().isoformat() + "Z"
+    )
+
+def idempotent_transaction_id(scoped_key: str) -> str:
+    """ID fixo por chave de idempotência: retries recomputados mantêm o mesmo ID"""
+    return f"txn_{hashlib.sha256(scoped_key.encode()).hexdigest()[:12]}"
+
+def request_fingerprint(request: ClassificationRequest) -> str:
+    """Hash estável do payload, para detectar reuso da chave com outros dados"""
+    payload = json.dumps(request.dict(), sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+async def run_classification(
+    request: ClassificationRequest,
+    deadline: Optional[Deadline] = None,
+    explain: bool = False,
+    top_k: Optional[int] = None,
+    transaction_id: Optional[str] = None
+) -> ClassificationResponse:
+    """Executa o pipeline completo de classificação de uma transação"""
+    logger.info(f"Classificando transação: R$ {request.amount:.2f}")
+    
+    # Preparar dados para o modelo
+    transaction_data = build_transaction_data(request)
+    
+    # Classificar usando modelo ML (fila limitada de workers)
+    try:
+        result = await inference_pool.run(
+            model_loader.predict, transaction_data,
+            deadline=deadline, explain=explain, top_k=top_k
+        )
+    except DeadlineExceeded:
+        # Prazo expirou na fila: responder sem ocupar um worker
+        result = model_loader.predict_fallback(transaction_data)
+    
+    response = build_classification_response(result, transaction_id)
+    
+    logger.info(f"Transação {response.transaction_id} classificada como: {result['classification']} (score: {result['fraud_score']:.2f})")
+    
+    # Em produção, aqui persistiria no banco de dados
+    # db.add(Transaction(...))
+    # db.commit()
+    
+    publish_classification(request, response)
+    
+    if deadline is not None and deadline.expired():
+        deadline_metrics.increment('deadline_missed')
+    
+    return response
+
+def publish_classification(request: ClassificationRequest, response: ClassificationResponse):
+    """Publica a classificação no feed ao vivo (dashboard)"""
+    if classification_feed.subscriber_count == 0:
+        return
+    classification_feed.publish({
+        'transaction_id': response.transaction_id,
+        'amount': request.amount,
+        'merchant_category': request.merchant_category,
+        'classification': response.classification,
+        'fraud_score': response.fraud_score,
+        'risk_level': response.details.risk_level,
+        'timestamp': response.timestamp,
+    })
+
 @router.post(
     "/classify",
     response_model=ClassificationResponse,
@@ -54,7 +169,12 @@ class ClassificationResponse(BaseModel):
 )
 async def classify_transaction(
     request: ClassificationRequest,
-    api_key: str = Depends(verify_api_key)
+    http_response: Response,
+    api_key: str = Depends(verify_api_key),
+    deadline: Optional[Deadline] = Depends(get_request_deadline),
+    idempotency_key: Optional[str] = Header(None, alias=settings.IDEMPOTENCY_HEADER),
+    explain: bool = Query(False, description="Incluir as top-k contribuições de features"),
+    top_k: int = Query(settings.EXPLAIN_TOP_K, ge=1, le=33, description="Número de features na explicação")
 ):
     """
     Classifica transação como Fraude (1) ou Não Fraude (0)
@@ -64,41 +184,46 @@ async def classify_transaction(
     - **day_of_week**: Dia da semana (0-6)
     - **merchant_category**: Categoria do comerciante
     - **location**: Dados de localização (país, estado, cidade)
+    
+    Header opcional `X-Deadline-Ms`: orçamento de tempo em ms. Se não for
+    possível cumpri-lo, a resposta vem de um avaliador mais barato com
+    `degraded=true`.
+    
+    Header opcional `Idempotency-Key` (ou campo `client_transaction_id`):
+    retries com a mesma chave recebem o resultado original, com o mesmo
+    `transaction_id`, sem reprocessar a transação. Resultados degradados não
+    são guardados: o retry é reprocessado, mantendo o `transaction_id`.
+    
+    Query `explain=true`: inclui as `top_k` features que mais contribuíram
+    para o score, calculadas a partir de tabelas pré-calculadas por nó.
     """
     try:
-        logger.info(f"Classificando transação: R$ {request.amount:.2f}")
-        
-        # Preparar dados para o modelo
-        transaction_data = {
-            'amount': request.amount,
-            'hour': request.hour,
-            'day_of_week': request.day_of_week,
-            'merchant_category': request.merchant_category,
-            'location': request.location.dict(),
-        }
+        key = idempotency_key or request.client_transaction_id
+        if not key:
+            return await run_classification(request, deadline, explain, top_k)
         
-        # Classificar usando modelo ML
-        result = model_loader.predict(transaction_data)
-        
-        # Gerar ID da transação
-        transaction_id = f"txn_{uuid.uuid4().hex[:12]}"
-        
-        logger.info(f"Transação {transaction_id} classificada como: {result['classification']} (score: {result['fraud_score']:.2f})")
-        
-        # Em produção, aqui persistiria no banco de dados
-        # db.add(Transaction(...))
-        # db.commit()
+        # Chaves são isoladas por API key; a explicação faz parte do resultado
+        scoped_key = f"{api_key or ''}:{key}"
+        response, replayed = await idempotency_store.run(
+            scoped_key,
+            f"{request_fingerprint(request)}:{explain}:{top_k if explain else ''}",
+            lambda: run_classification(
+                request, deadline, explain, top_k, idempotent_transaction_id(scoped_key)
+            ),
+            cacheable=lambda response: not response.degraded
+        )
+        if replayed:
+            logger.info(f"Retry idempotente: transação {response.transaction_id} reaproveitada")
+            http_response.headers["Idempotent-Replayed"] = "true"
         
         # Retornar resposta
-        return ClassificationResponse(
-            transaction_id=transaction_id,
-            classification=result['classification'],
-            fraud_score=result['fraud_score'],
-            confidence=result['confidence'],
-            details=ClassificationDetails(**result['details']),
-            timestamp=datetime.utcnow().isoformat() + "Z"
-        )
+        return response
     
+    except IdempotencyConflict:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Chave de idempotência já utilizada com outros dados"
+        )
     except ValueError as e:
         logger.error(f"Erro de validação: {e}")
         raise HTTPException(
@@ -0,0 +1,69 @@
+"""
+Endpoints do monitor de drift
+"""
+from fastapi import APIRouter, HTTPException, Depends, status
+from pydantic import BaseModel
+from typing import Any, Dict, List
+import logging
+
+from app.ml.model_loader import model_loader
+from app.core.security import verify_api_key
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+class DriftSketch(BaseModel):
+    names: List[str]  # Features, na ordem do baseline, seguidas de fraud_score
+    counts: List[List[int]]  # Contagens por bin de cada série
+
+def get_drift_monitor():
+    """Monitor carregado com o modelo (503 se não houver baseline)"""
+    if model_loader.drift_monitor is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Monitor de drift indisponível (drift_baseline.json não carregado)"
+        )
+    return model_loader.drift_monitor
+
+@router.get(
+    "/drift",
+    summary="Relatório de drift",
+    description="PSI e KS de cada feature e do fraud_score contra o baseline do treinamento"
+)
+async def drift_report(api_key: str = Depends(verify_api_key)) -> Dict[str, Any]:
+    """Relatório das predições observadas por este worker"""
+    return get_drift_monitor().report()
+
+@router.get(
+    "/drift/sketch",
+    response_model=DriftSketch,
+    summary="Contadores do monitor de drift",
+    description="Histogramas brutos deste worker, para agregação com outros workers"
+)
+async def drift_sketch(api_key: str = Depends(verify_api_key)):
+    return get_drift_monitor().sketch()
+
+@router.post(
+    "/drift/merge",
+    summary="Relatório de drift agregado",
+    description="Soma os sketches de vários workers e calcula o relatório sobre o total"
+)
+async def drift_merge(
+    sketches: List[DriftSketch],
+    api_key: str = Depends(verify_api_key)
+) -> Dict[str, Any]:
+    """
+    Agrega sketches obtidos em `GET /drift/sketch` de cada worker (os
+    contadores deste worker não são incluídos automaticamente)
+    """
+    merged = get_drift_monitor().empty_copy()
+    try:
+        for sketch in sketches:
+            merged.merge(sketch.dict())
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Sketch inválido: {str(e)}"
+        )
+    return merged.report()
@@ -0,0 +1,189 @@
+"""
+Endpoints WebSocket - classificação em streaming e feed ao vivo
+"""
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect, status
+from pydantic import ValidationError
+from typing import Any, Dict, List, Tuple
+import asyncio
+import json
+import logging
+
+from app.api.v1.endpoints.classify import (
+    ClassificationRequest,
+    build_transaction_data,
+    build_classification_response,
+    publish_classification,
+)
+from app.core.config import settings
+from app.core.feed import classification_feed
+from app.core.security import verify_websocket_api_key
+from app.ml.inference_pool import inference_pool
+from app.ml.model_loader import model_loader
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+class StreamSession:
+    """
+    Sessão de classificação sobre uma conexão WebSocket.
+
+    O cliente envia mensagens `{"request_id": "...", "transaction": {...}}`
+    (opcionalmente com `"explain": true`)
+    sem precisar esperar as respostas (pipelining). Mensagens que chegam
+    próximas são agrupadas e classificadas com uma única chamada ao modelo.
+    Quando o limite de requisições em andamento é atingido, a sessão para
+    de ler o socket até que alguma resposta seja enviada (backpressure).
+    """
+
+    def __init__(self, websocket: WebSocket):
+        self.websocket = websocket
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.in_flight = asyncio.Semaphore(settings.STREAM_MAX_IN_FLIGHT)
+        self.send_lock = asyncio.Lock()
+        self.batch_window = settings.STREAM_BATCH_WINDOW_MS / 1000.0
+        self.max_batch_size = settings.STREAM_MAX_BATCH_SIZE
+
+    async def run(self):
+        """Executa leitura e classificação até o cliente desconectar"""
+        worker = asyncio.create_task(self._batch_worker())
+        try:
+            await self._receive_loop()
+        except WebSocketDisconnect:
+            logger.info("Cliente WebSocket desconectado")
+        finally:
+            worker.cancel()
+            await asyncio.gather(worker, return_exceptions=True)
+
+    async def _send(self, message: Dict[str, Any]):
+        async with self.send_lock:
+            await self.websocket.send_json(message)
+
+    async def _receive_loop(self):
+        while True:
+            # Backpressure: só lê a próxima mensagem se houver vaga
+            await self.in_flight.acquire()
+            try:
+                raw = await self.websocket.receive_text()
+            except BaseException:
+                self.in_flight.release()
+                raise
+
+            request_id = None
+            try:
+                message = json.loads(raw)
+                request_id = message.get('request_id')
+                if request_id is None:
+                    raise ValueError("campo 'request_id' é obrigatório")
+                request = ClassificationRequest(**message.get('transaction', {}))
+                explain = bool(message.get('explain', False))
+            except (ValueError, TypeError, AttributeError, ValidationError) as e:
+                self.in_flight.release()
+                await self._send({
+                    'request_id': request_id,
+                    'error': f"Dados inválidos: {str(e)}"
+                })
+                continue
+
+            self.queue.put_nowait((request_id, request, explain))
+
+    async def _collect_batch(self) -> List[Tuple[Any, ClassificationRequest, bool]]:
+        """Aguarda a primeira mensagem e agrupa as que chegarem na janela"""
+        batch = [await self.queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.batch_window
+
+        while len(batch) < self.max_batch_size:
+            if not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+                continue
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+
+        return batch
+
+    async def _batch_worker(self):
+        while True:
+            batch = await self._collect_batch()
+            try:
+                for message in await self._classify_batch(batch):
+                    await self._send(message)
+            except (WebSocketDisconnect, RuntimeError):
+                # Conexão encerrada durante o envio
+                return
+            finally:
+                for _ in batch:
+                    self.in_flight.release()
+
+    async def _classify_batch(self, batch: List[Tuple[Any, ClassificationRequest, bool]]) -> List[Dict[str, Any]]:
+        """Mensagens de resposta do lote: um resultado ou erro por requisição"""
+        try:
+            transactions = [build_transaction_data(request) for _, request, _ in batch]
+            explain = [flag for _, _, flag in batch]
+            # Inferência é CPU-bound: roda no pool de workers, fora do event loop
+            results = await inference_pool.run(
+                model_loader.predict_batch, transactions,
+                explain=explain if any(explain) else None
+            )
+
+            messages = []
+            for (request_id, request, _), result in zip(batch, results):
+                response = build_classification_response(result)
+                publish_classification(request, response)
+                messages.append({
+                    'request_id': request_id,
+                    'result': response.dict()
+                })
+            return messages
+        except Exception as e:
+            # Falha na inferência (inclusive RuntimeError) vira erro por requisição
+            logger.error(f"Erro ao classificar lote via WebSocket: {e}", exc_info=True)
+            return [
+                {
+                    'request_id': request_id,
+                    'error': f"Erro interno ao processar classificação: {str(e)}"
+                }
+                for request_id, _, _ in batch
+            ]
+
+@router.websocket("/ws/classify")
+async def classify_stream(websocket: WebSocket):
+    """
+    Classificação em streaming sobre uma conexão persistente.
+
+    - Envio: `{"request_id": "abc", "transaction": {<ClassificationRequest>}, "explain": false}`
+    - Resposta: `{"request_id": "abc", "result": {<ClassificationResponse>}}`
+      ou `{"request_id": "abc", "error": "..."}`
+    """
+    if not verify_websocket_api_key(websocket):
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    await websocket.accept()
+    await StreamSession(websocket).run()
+
+@router.websocket("/ws/feed")
+async def classification_feed_stream(websocket: WebSocket):
+    """
+    Feed ao vivo: envia cada classificação realizada (HTTP ou WebSocket)
+    para o assinante, sem que ele precise fazer uma requisição por evento.
+    """
+    if not verify_websocket_api_key(websocket):
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    await websocket.accept()
+    queue = classification_feed.subscribe()
+    try:
+        while True:
+            event = await queue.get()
+            await websocket.send_json(event)
+    except (WebSocketDisconnect, RuntimeError):
+        logger.info("Assinante do feed desconectado")
+    finally:
+        classification_feed.unsubscribe(queue)
@@ -2,7 +2,7 @@
 Configurações da aplicação
 """
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import List, Optional
 
 class Settings(BaseSettings):
     # API
@@ -29,6 +29,56 @@ class Settings(BaseSettings):
     SCALER_PATH: str = "../ml/scalers/amount_scaler.pkl"
     FEATURES_PATH: str = "../ml/models/feature_columns.json"
     
+    # Aquecimento e prontidão (/ready)
+    WARMUP_ENABLED: bool = True
+    WARMUP_SYNTHETIC_COUNT: int = 200
+    WARMUP_EXAMPLES_PATH: str = "../dashboard-web/fraud_examples.json"
+    WARMUP_MIN_ITERATIONS: int = 50
+    WARMUP_MAX_ITERATIONS: int = 2000
+    WARMUP_WINDOW: int = 20  # Predições recentes usadas no p95
+    WARMUP_LATENCY_THRESHOLD_MS: float = 50.0
+    WARMUP_RETRY_INTERVAL_SECONDS: float = 10.0  # Nova medição enquanto not_ready
+    
+    # Modo de inferência: "full" (floresta completa), "early_exit" ou "compact"
+    SCORING_MODE: str = "full"
+    EARLY_EXIT_DELTA: float = 0.01  # Probabilidade máxima de a classe mudar (dividida entre as verificações)
+    EARLY_EXIT_MIN_TREES: int = 10
+    EARLY_EXIT_STEP: int = 5  # Árvores avaliadas entre verificações do limite
+    EARLY_EXIT_TREE_ORDER: str = "fixed"  # "fixed" ou "importance" (tree_order.json)
+    COMPACT_FOREST_QUANTIZATION: str = "float32"  # Usada se compact_forest.npz não existir
+    
+    # Cascata: pré-filtro barato antes da floresta (prefilter.pkl + cascade_config.json)
+    CASCADE_ENABLED: bool = False
+    
+    # Explicações (contribuições de features por caminho nas árvores)
+    EXPLAIN_ENABLED: bool = True  # Pré-calcula as tabelas no carregamento
+    EXPLAIN_TOP_K: int = 5
+    EXPLAIN_TIME_CAP_MS: float = 20.0  # Limite por requisição
+    EXPLAIN_BATCH_TIME_CAP_MS: float = 100.0  # Limite por lote (WebSocket)
+    
+    # Monitor de drift (drift_baseline.json gerado no treinamento)
+    DRIFT_MONITOR_ENABLED: bool = True
+    DRIFT_MIN_OBSERVATIONS: int = 1000  # Abaixo disso, status insufficient_data
+    
+    # Prazos por requisição
+    DEADLINE_HEADER: str = "X-Deadline-Ms"  # Orçamento em ms, contado na chegada
+    DEFAULT_DEADLINE_MS: Optional[float] = None  # Sem prazo se o header não vier
+    DEADLINE_SAFETY_MARGIN_MS: float = 2.0
+    DEADLINE_REDUCED_TREES: int = 10  # Árvores usadas na degradação
+    DEADLINE_LATENCY_PROBE_SECONDS: float = 5.0  # Intervalo máximo sem medir a floresta completa
+    INFERENCE_WORKERS: int = 4  # Inferências simultâneas
+    
+    # Idempotência (retries de clientes)
+    IDEMPOTENCY_HEADER: str = "Idempotency-Key"
+    IDEMPOTENCY_TTL_SECONDS: float = 600.0
+    IDEMPOTENCY_MAX_ENTRIES: int = 100000
+    
+    # Streaming (WebSocket)
+    STREAM_BATCH_WINDOW_MS: float = 5.0  # Janela para agrupar mensagens próximas
+    STREAM_MAX_BATCH_SIZE: int = 64
+    STREAM_MAX_IN_FLIGHT: int = 256  # Limite de pipelining por conexão
+    FEED_QUEUE_SIZE: int = 1000  # Buffer por assinante do feed ao vivo
+    
     class Config:
         env_file = ".env"
         case_sensitive = True
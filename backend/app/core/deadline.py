@@ -0,0 +1,70 @@
+"""
+Prazo por requisição (deadline) e métricas de prazos perdidos
+"""
+from fastapi import Header, HTTPException, status
+from typing import Dict, Optional
+import math
+import threading
+import time
+
+from app.core.config import settings
+
+class Deadline:
+    """Prazo absoluto em relógio monotônico, criado na chegada da requisição"""
+    
+    def __init__(self, budget_ms: float):
+        self.budget_ms = budget_ms
+        self.expires_at = time.monotonic() + budget_ms / 1000.0
+    
+    def remaining_ms(self) -> float:
+        return (self.expires_at - time.monotonic()) * 1000.0
+    
+    def expired(self) -> bool:
+        return self.remaining_ms() <= 0
+
+class DeadlineExceeded(Exception):
+    """O prazo expirou antes de a inferência começar"""
+
+class DeadlineMetrics:
+    """Contadores de requisições com prazo (thread-safe)"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {
+            'requests_with_deadline': 0,
+            'expired_in_queue': 0,      # Expirou antes de chegar a um worker
+            'degraded_reduced_forest': 0,  # Orçamento insuficiente para a floresta completa
+            'degraded_heuristic': 0,    # Orçamento insuficiente até para o subconjunto
+            'deadline_missed': 0,       # Resposta pronta depois do prazo
+            'latency_probes': 0,        # Inferências completas só para re-medir a latência
+        }
+    
+    def increment(self, name: str):
+        with self._lock:
+            self._counters[name] += 1
+    
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._counters)
+
+deadline_metrics = DeadlineMetrics()
+
+async def get_request_deadline(
+    x_deadline_ms: Optional[float] = Header(
+        None,
+        alias=settings.DEADLINE_HEADER,
+        description="Orçamento de tempo da requisição em milissegundos"
+    )
+) -> Optional[Deadline]:
+    """Cria o prazo da requisição a partir do header (ou do padrão configurado)"""
+    budget_ms = x_deadline_ms if x_deadline_ms is not None else settings.DEFAULT_DEADLINE_MS
+    if budget_ms is None:
+        return None
+    # nan passaria por `<= 0` e chegaria ao wait_for; inf não é um prazo
+    if not math.isfinite(budget_ms) or budget_ms <= 0:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"{settings.DEADLINE_HEADER} deve ser um número finito maior que zero"
+        )
+    deadline_metrics.increment('requests_with_deadline')
+    return Deadline(budget_ms)
@@ -0,0 +1,51 @@
+"""
+Feed ao vivo de classificações (publish/subscribe em memória)
+"""
+import asyncio
+import logging
+from typing import Any, Dict, Set
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+class ClassificationFeed:
+    """
+    Distribui cada classificação para os assinantes conectados.
+    Cada assinante tem uma fila limitada; se ele não acompanhar o ritmo,
+    eventos são descartados em vez de bloquear o caminho de classificação.
+    """
+    
+    def __init__(self, queue_size: int = settings.FEED_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._subscribers: Set[asyncio.Queue] = set()
+        self.dropped_events = 0
+    
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+    
+    def subscribe(self) -> asyncio.Queue:
+        """Registra um novo assinante e retorna sua fila"""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.add(queue)
+        return queue
+    
+    def unsubscribe(self, queue: asyncio.Queue):
+        """Remove um assinante"""
+        self._subscribers.discard(queue)
+    
+    def publish(self, event: Dict[str, Any]):
+        """Publica um evento para todos os assinantes (não bloqueante)"""
+        previous = self.dropped_events
+        for queue in self._subscribers:
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                self.dropped_events += 1
+        # Avisa uma vez a cada 1000 descartes, mesmo que esta chamada pule o múltiplo
+        if self.dropped_events // 1000 > previous // 1000:
+            logger.warning(f"Feed ao vivo descartou {self.dropped_events} eventos (assinantes lentos)")
+
+# Singleton compartilhado entre HTTP e WebSocket
+classification_feed = ClassificationFeed()
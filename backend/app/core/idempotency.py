@@ -0,0 +1,110 @@
+"""
+Deduplicação de requisições idempotentes (retries de clientes)
+"""
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+import asyncio
+import time
+
+from app.core.config import settings
+
+class IdempotencyConflict(Exception):
+    """A mesma chave foi reutilizada com um payload diferente"""
+
+class IdempotencyStore:
+    """
+    Guarda resultados por chave de idempotência.
+    
+    - Duplicatas concorrentes aguardam a única computação em andamento.
+    - Resultados concluídos ficam em um cache LRU limitado com TTL.
+    - Falhas não são guardadas: o próximo retry computa de novo.
+    - Resultados recusados por `cacheable` (ex: respostas degradadas) também
+      não: só duplicatas concorrentes os recebem.
+    """
+    
+    def __init__(
+        self,
+        ttl_seconds: float = settings.IDEMPOTENCY_TTL_SECONDS,
+        max_entries: int = settings.IDEMPOTENCY_MAX_ENTRIES
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        # chave -> (expira_em, fingerprint, resultado)
+        self._completed: "OrderedDict[str, Tuple[float, str, Any]]" = OrderedDict()
+        # chave -> (fingerprint, future)
+        self._in_flight: Dict[str, Tuple[str, asyncio.Future]] = {}
+    
+    def __len__(self) -> int:
+        return len(self._completed)
+    
+    def _lookup(self, key: str) -> Optional[Tuple[str, Any]]:
+        entry = self._completed.get(key)
+        if entry is None:
+            return None
+        expires_at, fingerprint, result = entry
+        if expires_at <= time.monotonic():
+            del self._completed[key]
+            return None
+        self._completed.move_to_end(key)
+        return fingerprint, result
+    
+    def _store(self, key: str, fingerprint: str, result: Any):
+        self._completed[key] = (time.monotonic() + self.ttl_seconds, fingerprint, result)
+        self._completed.move_to_end(key)
+        while len(self._completed) > self.max_entries:
+            self._completed.popitem(last=False)
+    
+    async def run(
+        self,
+        key: str,
+        fingerprint: str,
+        compute: Callable[[], Awaitable[Any]],
+        cacheable: Optional[Callable[[Any], bool]] = None
+    ) -> Tuple[Any, bool]:
+        """
+        Retorna (resultado, replayed). `replayed` é True quando o resultado
+        veio de uma computação anterior ou concorrente com a mesma chave.
+        """
+        cached = self._lookup(key)
+        if cached is not None:
+            cached_fingerprint, result = cached
+            if cached_fingerprint != fingerprint:
+                raise IdempotencyConflict(key)
+            return result, True
+        
+        in_flight = self._in_flight.get(key)
+        if in_flight is not None:
+            in_flight_fingerprint, future = in_flight
+            if in_flight_fingerprint != fingerprint:
+                raise IdempotencyConflict(key)
+            try:
+                # shield: o cancelamento de um retry não cancela a computação original
+                return await asyncio.shield(future), True
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+                # A computação original foi cancelada (cliente desconectou): refazer
+                return await self.run(key, fingerprint, compute, cacheable)
+        
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = (fingerprint, future)
+        try:
+            result = await compute()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Marca a exceção como consumida caso não haja duplicatas esperando
+            future.exception()
+            raise
+        else:
+            if cacheable is None or cacheable(result):
+                self._store(key, fingerprint, result)
+            future.set_result(result)
+            return result, False
+        finally:
+            self._in_flight.pop(key, None)
+
+# Singleton compartilhado pelos endpoints
+idempotency_store = IdempotencyStore()
@@ -1,20 +1,21 @@
 """
 Segurança e Autenticação
 """
-from fastapi import HTTPException, Security, status
+from fastapi import HTTPException, Security, WebSocket, status
 from fastapi.security import APIKeyHeader
 from app.core.config import settings
 import os
+from typing import Optional
 
 api_key_header = APIKeyHeader(name=settings.API_KEY_HEADER, auto_error=False)
 
-async def verify_api_key(api_key: str = Security(api_key_header)):
+def is_valid_api_key(api_key: Optional[str]) -> bool:
     """
-    Verifica a API key fornecida no header
+    Valida uma API key contra as chaves configuradas
     """
     # Em desenvolvimento, permitir sem API key se configurado
     if os.getenv("ENVIRONMENT") == "development" and not api_key:
-        return api_key
+        return True
     
     # Carregar API keys (em produção, virá do Secrets Manager)
     valid_keys = settings.API_KEYS
@@ -24,7 +25,13 @@ async def verify_api_key(api_key: str = Security(api_key_header)):
         if env_key:
             valid_keys = [env_key]
     
-    if not api_key or api_key not in valid_keys:
+    return bool(api_key) and api_key in valid_keys
+
+async def verify_api_key(api_key: str = Security(api_key_header)):
+    """
+    Verifica a API key fornecida no header
+    """
+    if not is_valid_api_key(api_key):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="API key inválida ou ausente",
@@ -33,3 +40,14 @@ async def verify_api_key(api_key: str = Security(api_key_header)):
     
     return api_key
 
+def verify_websocket_api_key(websocket: WebSocket) -> bool:
+    """
+    Verifica a API key de uma conexão WebSocket.
+    Navegadores não permitem headers customizados no handshake,
+    então a chave também é aceita no query param `api_key`.
+    """
+    api_key = (
+        websocket.headers.get(settings.API_KEY_HEADER)
+        or websocket.query_params.get("api_key")
+    )
+    return is_valid_api_key(api_key)
@@ -1,32 +1,62 @@
 """
 FastAPI Backend - Sistema Classificador de Fraude
 """
-from fastapi import FastAPI
+from fastapi import FastAPI, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from contextlib import asynccontextmanager
+import asyncio
 import os
+import time
 from dotenv import load_dotenv
 
-from app.api.v1.endpoints import classify
+from app.api.v1.endpoints import classify, drift, stream
 from app.ml.model_loader import model_loader
+from app.ml.warmup import warmup_state
 from app.core.config import settings
+from app.core.deadline import deadline_metrics
 
 load_dotenv()
 
+async def warm_up_model():
+    """Aquece o modelo fora do event loop; /ready só responde 200 ao final"""
+    try:
+        await run_in_threadpool(warmup_state.run, model_loader)
+    except Exception as e:
+        warmup_state.status = 'not_ready'
+        print(f"⚠️ Aviso: Aquecimento falhou: {e}")
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Gerenciamento do ciclo de vida da aplicação"""
     # Startup: Carregar modelo ML
     print("🚀 Iniciando aplicação...")
+    start = time.perf_counter()
     try:
         model_loader.load_model()
         print("✅ Modelo ML carregado com sucesso")
     except Exception as e:
         print(f"⚠️ Aviso: Modelo ML não pôde ser carregado: {e}")
         print("⚠️ A aplicação continuará sem o modelo ML")
+    warmup_state.model_load_ms = (time.perf_counter() - start) * 1000.0
+    print(f"⏱️ Cold start (carregamento): {warmup_state.model_load_ms:.0f} ms")
+    
+    # Aquecimento em segundo plano: /health responde, /ready espera
+    warmup_task = None
+    if not model_loader.is_loaded:
+        warmup_state.model_missing()
+    elif settings.WARMUP_ENABLED:
+        warmup_task = asyncio.create_task(warm_up_model())
+    else:
+        warmup_state.skip()
     
     yield
     
+    warmup_state.stop()
+    if warmup_task is not None and not warmup_task.done():
+        warmup_task.cancel()
+    
     # Shutdown: Limpar recursos
     print("🛑 Encerrando aplicação...")
 
@@ -57,8 +87,36 @@ async def health_check():
         "model_loaded": model_loader.is_loaded
     }
 
+# Readiness Check
+@app.get("/ready")
+async def readiness_check():
+    """
+    Endpoint de readiness: 200 somente depois do aquecimento, com a
+    latência medida abaixo de WARMUP_LATENCY_THRESHOLD_MS, e nunca sem modelo
+    """
+    ready = warmup_state.is_ready and model_loader.is_loaded
+    body = {
+        "ready": ready,
+        "model_loaded": model_loader.is_loaded,
+        **warmup_state.snapshot()
+    }
+    if not ready:
+        return JSONResponse(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, content=body)
+    return body
+
+# Métricas
+@app.get("/metrics")
+async def metrics():
+    """Contadores operacionais (prazos perdidos e degradações)"""
+    return {
+        "deadlines": deadline_metrics.snapshot(),
+        "inference_latency_ms": model_loader.inference_latency_ms
+    }
+
 # Incluir rotas
 app.include_router(classify.router, prefix="/api/v1", tags=["classification"])
+app.include_router(stream.router, prefix="/api/v1", tags=["streaming"])
+app.include_router(drift.router, prefix="/api/v1", tags=["monitoring"])
 
 if __name__ == "__main__":
     import uvicorn
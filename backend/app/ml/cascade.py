@@ -0,0 +1,70 @@
+"""
+Cascata de classificação em dois estágios
+
+Um modelo barato (regressão logística ou árvore rasa, treinado por
+train_model.py) avalia todas as transações. Apenas a faixa incerta, entre
+os limiares calibrados para o recall alvo, segue para a Random Forest.
+"""
+import json
+import logging
+from pathlib import Path
+from typing import Optional
+
+import joblib
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+class ScoringCascade:
+    """Pré-filtro de primeiro estágio com limiares calibrados"""
+
+    def __init__(self, prefilter, low_threshold: float, high_threshold: Optional[float] = None):
+        self.prefilter = prefilter
+        self.low_threshold = low_threshold
+        # None desativa a decisão de fraude no primeiro estágio
+        self.high_threshold = high_threshold
+        self.fraud_index = list(prefilter.classes_).index(1)
+
+        # Caminho rápido para modelos lineares: um produto escalar por linha
+        self._coef = None
+        if hasattr(prefilter, 'coef_') and prefilter.coef_.shape[0] == 1:
+            self._coef = prefilter.coef_[0].astype(np.float64)
+            self._intercept = float(prefilter.intercept_[0])
+
+    @classmethod
+    def load(cls, model_dir: Path) -> Optional['ScoringCascade']:
+        """Carrega prefilter.pkl e cascade_config.json, se existirem"""
+        prefilter_path = model_dir / 'prefilter.pkl'
+        config_path = model_dir / 'cascade_config.json'
+        if not prefilter_path.exists() or not config_path.exists():
+            return None
+
+        with open(config_path, 'r') as f:
+            config = json.load(f)
+
+        cascade = cls(
+            joblib.load(prefilter_path),
+            low_threshold=config['low_threshold'],
+            high_threshold=config.get('high_threshold')
+        )
+        logger.info(
+            f"Cascata carregada (low={cascade.low_threshold:.4f}, "
+            f"high={cascade.high_threshold}, recall alvo={config.get('target_recall')})"
+        )
+        return cascade
+
+    def score(self, features: np.ndarray) -> np.ndarray:
+        """Probabilidade de fraude segundo o pré-filtro"""
+        if self._coef is not None:
+            logits = features @ self._coef + self._intercept
+            proba = 1.0 / (1.0 + np.exp(-logits))
+            # Modelos lineares binários modelam a classe de índice 1
+            return proba if self.fraud_index == 1 else 1.0 - proba
+        return self.prefilter.predict_proba(features)[:, self.fraud_index]
+
+    def uncertain_mask(self, scores: np.ndarray) -> np.ndarray:
+        """Linhas que precisam ser decididas pela floresta completa"""
+        mask = scores >= self.low_threshold
+        if self.high_threshold is not None:
+            mask &= scores < self.high_threshold
+        return mask
@@ -0,0 +1,280 @@
+"""
+Representação compacta da Random Forest para inferência
+
+Cada nó ocupa um registro empacotado (feature int16, limiar de 32 ou 16 bits,
+filho direito int32) em um único array contíguo, com os nós de cada árvore
+em pré-ordem: o filho esquerdo é sempre o nó seguinte, o que mantém o
+caminho mais comum sequencial na memória. Folhas guardam apenas a
+probabilidade de fraude (float32) em vez do array completo de contagens.
+
+Quantizações de limiar:
+
+- float32: limiar arredondado para baixo no float32 mais próximo. Como o
+  sklearn já converte a entrada para float32, a decisão é idêntica.
+- uint16: limiares substituídos pelo índice do bin da feature (16 bits sem
+  sinal). Os limites dos bins são os limiares arredondados para baixo em
+  float32, e a entrada é quantizada com os mesmos limites, também sem perda
+  de decisão.
+
+Exportação e relatório (memória antes/depois e concordância):
+
+    python -m app.ml.compact_forest --model ../ml/models/fraud_classifier.pkl \
+        --quantization uint16 --holdout ../ml/data/holdout.npz
+"""
+import argparse
+import logging
+import pickle
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import joblib
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+QUANTIZATIONS = ('float32', 'uint16')
+
+# Nome anterior de uint16, aceito em arquivos já exportados
+QUANTIZATION_ALIASES = {'int16': 'uint16'}
+
+def _node_dtype(quantization: str) -> np.dtype:
+    threshold_type = '<f4' if quantization == 'float32' else '<u2'
+    # Registro empacotado (sem padding): 10 bytes em float32, 8 bytes em uint16
+    return np.dtype([('feature', '<i2'), ('threshold', threshold_type), ('right', '<i4')])
+
+def _floor_float32(values):
+    """Maior float32 <= valor: x32 <= t32 equivale a x32 <= valor original"""
+    values = np.asarray(values, dtype=np.float64)
+    t32 = values.astype(np.float32)
+    t32 = np.where(t32 > values, np.nextafter(t32, np.float32(-np.inf)), t32)
+    return t32.astype(np.float32)
+
+class CompactForest:
+    """Floresta achatada em arrays contíguos e quantizados"""
+
+    def __init__(
+        self,
+        nodes: np.ndarray,
+        roots: np.ndarray,
+        leaf_values: np.ndarray,
+        quantization: str,
+        bin_edges: Optional[np.ndarray] = None,
+        bin_offsets: Optional[np.ndarray] = None,
+    ):
+        quantization = QUANTIZATION_ALIASES.get(quantization, quantization)
+        if quantization not in QUANTIZATIONS:
+            raise ValueError(f"Quantização inválida: {quantization}")
+        self.nodes = nodes
+        self.roots = roots
+        self.leaf_values = leaf_values
+        self.quantization = quantization
+        self.bin_edges = bin_edges
+        self.bin_offsets = bin_offsets
+        self.n_trees = len(roots)
+
+    @classmethod
+    def from_sklearn(cls, forest, quantization: str = 'float32') -> 'CompactForest':
+        """Converte um RandomForestClassifier treinado"""
+        quantization = QUANTIZATION_ALIASES.get(quantization, quantization)
+        if quantization not in QUANTIZATIONS:
+            raise ValueError(f"Quantização inválida: {quantization}")
+
+        fraud_index = list(forest.classes_).index(1)
+        trees = [estimator.tree_ for estimator in forest.estimators_]
+        n_features = forest.n_features_in_
+
+        bin_edges = bin_offsets = None
+        if quantization == 'uint16':
+            bin_edges, bin_offsets = cls._build_bins(trees, n_features)
+
+        total_nodes = sum(tree.node_count for tree in trees)
+        nodes = np.zeros(total_nodes, dtype=_node_dtype(quantization))
+        roots = np.zeros(len(trees), dtype=np.int32)
+        leaf_values = []
+
+        position = 0
+        for t, tree in enumerate(trees):
+            roots[t] = position
+            values = tree.value[:, 0, :]
+            # Pré-ordem explícita: filho esquerdo logo após o pai
+            stack = [(0, None)]
+            while stack:
+                node, parent = stack.pop()
+                if parent is not None:
+                    nodes['right'][parent] = position
+                left, right = tree.children_left[node], tree.children_right[node]
+                if left == -1:
+                    total = values[node].sum()
+                    nodes['feature'][position] = -1
+                    nodes['right'][position] = len(leaf_values)
+                    leaf_values.append(values[node, fraud_index] / total if total > 0 else 0.0)
+                else:
+                    feature = tree.feature[node]
+                    nodes['feature'][position] = feature
+                    nodes['threshold'][position] = cls._quantize_threshold(
+                        tree.threshold[node], feature, quantization, bin_edges, bin_offsets
+                    )
+                    # Direita empilhada primeiro para a esquerda ser o próximo nó
+                    stack.append((right, position))
+                    stack.append((left, None))
+                position += 1
+
+        return cls(
+            nodes, roots, np.asarray(leaf_values, dtype=np.float32),
+            quantization, bin_edges, bin_offsets
+        )
+
+    @staticmethod
+    def _build_bins(trees, n_features: int):
+        """
+        Limiares distintos por feature, ordenados, em um único array float32.
+        Cada limiar é arredondado para baixo (`_floor_float32`): para entrada
+        float32, x <= limiar equivale a x <= limite do bin.
+        """
+        per_feature = [[] for _ in range(n_features)]
+        for tree in trees:
+            internal = tree.children_left != -1
+            for feature, threshold in zip(tree.feature[internal], tree.threshold[internal]):
+                per_feature[feature].append(threshold)
+
+        edges = [np.unique(_floor_float32(np.asarray(t, dtype=np.float64))) for t in per_feature]
+        for feature, feature_edges in enumerate(edges):
+            if len(feature_edges) > np.iinfo(np.uint16).max:
+                raise ValueError(
+                    f"Feature {feature} tem {len(feature_edges)} limiares distintos; "
+                    "use quantização float32"
+                )
+        offsets = np.zeros(n_features + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(e) for e in edges])
+        return np.concatenate(edges) if offsets[-1] else np.zeros(0, dtype=np.float32), offsets
+
+    @staticmethod
+    def _quantize_threshold(threshold, feature, quantization, bin_edges, bin_offsets):
+        t32 = _floor_float32(threshold)
+        if quantization == 'uint16':
+            feature_edges = bin_edges[bin_offsets[feature]:bin_offsets[feature + 1]]
+            return np.searchsorted(feature_edges, t32)
+        return t32
+
+    def _prepare(self, X) -> np.ndarray:
+        """Converte a entrada para o mesmo domínio dos limiares"""
+        X32 = np.asarray(X, dtype=np.float32)
+        if self.quantization == 'float32':
+            return X32
+        # Código do bin = número de limiares estritamente menores que x,
+        # então x <= limiar_j equivale a codigo(x) <= j
+        codes = np.empty(X32.shape, dtype=np.uint16)
+        for feature in range(X32.shape[1]):
+            feature_edges = self.bin_edges[self.bin_offsets[feature]:self.bin_offsets[feature + 1]]
+            codes[:, feature] = np.searchsorted(feature_edges, X32[:, feature])
+        return codes
+
+    def predict_proba(self, X) -> np.ndarray:
+        """Probabilidade de fraude de cada linha (média das árvores)"""
+        Xq = self._prepare(X)
+        n_samples = Xq.shape[0]
+
+        # Todas as árvores avançam juntas, um nível por iteração
+        node = np.repeat(self.roots, n_samples)
+        rows = np.tile(np.arange(n_samples), self.n_trees)
+        features = self.nodes['feature']
+        thresholds = self.nodes['threshold']
+        rights = self.nodes['right']
+
+        active = np.flatnonzero(features[node] >= 0)
+        while active.size:
+            current = node[active]
+            go_left = Xq[rows[active], features[current]] <= thresholds[current]
+            node[active] = np.where(go_left, current + 1, rights[current])
+            active = active[features[node[active]] >= 0]
+
+        leaf_values = self.leaf_values[rights[node]].astype(np.float64)
+        return leaf_values.reshape(self.n_trees, n_samples).mean(axis=0)
+
+    @property
+    def nbytes(self) -> int:
+        total = self.nodes.nbytes + self.roots.nbytes + self.leaf_values.nbytes
+        if self.bin_edges is not None:
+            total += self.bin_edges.nbytes + self.bin_offsets.nbytes
+        return total
+
+    def save(self, path: Path):
+        arrays = {
+            'nodes': self.nodes,
+            'roots': self.roots,
+            'leaf_values': self.leaf_values,
+            'quantization': np.array(self.quantization),
+        }
+        if self.bin_edges is not None:
+            arrays['bin_edges'] = self.bin_edges
+            arrays['bin_offsets'] = self.bin_offsets
+        np.savez(path, **arrays)
+
+    @classmethod
+    def load(cls, path: Path) -> Optional['CompactForest']:
+        if not Path(path).exists():
+            return None
+        data = np.load(path)
+        return cls(
+            data['nodes'],
+            data['roots'],
+            data['leaf_values'],
+            str(data['quantization']),
+            data['bin_edges'] if 'bin_edges' in data else None,
+            data['bin_offsets'] if 'bin_offsets' in data else None,
+        )
+
+def forest_nbytes(forest) -> Dict[str, int]:
+    """Memória da floresta original: arrays das árvores e tamanho serializado"""
+    arrays = 0
+    for estimator in forest.estimators_:
+        state = estimator.tree_.__getstate__()
+        arrays += state['nodes'].nbytes + state['values'].nbytes
+    return {'tree_arrays': arrays, 'pickled': len(pickle.dumps(forest, protocol=pickle.HIGHEST_PROTOCOL))}
+
+def compare(compact: CompactForest, forest, X) -> Dict[str, Any]:
+    """Concordância entre a floresta compacta e a original"""
+    fraud_index = list(forest.classes_).index(1)
+    original = forest.predict_proba(X)[:, fraud_index]
+    quantized = compact.predict_proba(X)
+    return {
+        'samples': int(len(X)),
+        'class_agreement': float(((original > 0.5) == (quantized > 0.5)).mean()),
+        'max_score_diff': float(np.abs(original - quantized).max()),
+        'mean_score_diff': float(np.abs(original - quantized).mean()),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Exporta a floresta em formato compacto")
+    parser.add_argument('--model', default='../ml/models/fraud_classifier.pkl')
+    parser.add_argument('--quantization', choices=QUANTIZATIONS, default='float32')
+    parser.add_argument('--output', default=None,
+                        help="Padrão: compact_forest.npz ao lado do modelo")
+    parser.add_argument('--holdout', default=None,
+                        help="Arquivo .npz com X para medir a concordância")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    forest = joblib.load(args.model)
+    compact = CompactForest.from_sklearn(forest, args.quantization)
+
+    output = Path(args.output) if args.output else Path(args.model).parent / 'compact_forest.npz'
+    compact.save(output)
+    logger.info(f"Floresta compacta salva: {output}")
+
+    before = forest_nbytes(forest)
+    logger.info(f"Nós: {len(compact.nodes)} em {compact.n_trees} árvores ({compact.nodes.itemsize} bytes/nó)")
+    logger.info(f"Memória original (arrays das árvores): {before['tree_arrays'] / 1e6:.2f} MB")
+    logger.info(f"Memória original (pickle): {before['pickled'] / 1e6:.2f} MB")
+    logger.info(f"Memória compacta ({args.quantization}): {compact.nbytes / 1e6:.2f} MB "
+                f"({before['tree_arrays'] / compact.nbytes:.1f}x menor)")
+    if compact.bin_edges is not None:
+        logger.info(f"Limites dos bins: {len(compact.bin_edges)} ({compact.bin_edges.nbytes / 1e6:.2f} MB)")
+
+    if args.holdout:
+        report = compare(compact, forest, np.load(args.holdout)['X'])
+        for key, value in report.items():
+            logger.info(f"{key}: {value}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""
+Monitor de drift em streaming, com memória constante
+
+Para cada uma das features do modelo e para o `fraud_score`, mantém um
+histograma de bins fixos, com os limites definidos no baseline gerado por
+train_model.py (`drift_baseline.json`). Cada predição atualiza os contadores
+em O(1) em relação ao volume já observado; contadores de workers diferentes
+são somados diretamente (mesmos limites), então os sketches são mergeáveis.
+"""
+import json
+import logging
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Faixas usuais de PSI
+PSI_MODERATE = 0.1
+PSI_SIGNIFICANT = 0.25
+
+# Com poucas observações a PSI é dominada por ruído de amostragem (bins
+# vazios): abaixo deste número nenhuma série é classificada como drift
+MIN_OBSERVATIONS = 1000
+
+SCORE_NAME = 'fraud_score'
+
+def population_stability_index(expected: np.ndarray, actual: np.ndarray, epsilon: float = 1e-6) -> float:
+    """PSI entre duas distribuições em bins (contagens)"""
+    e = expected / max(expected.sum(), 1)
+    a = actual / max(actual.sum(), 1)
+    e = np.clip(e, epsilon, None)
+    a = np.clip(a, epsilon, None)
+    return float(np.sum((a - e) * np.log(a / e)))
+
+def binned_ks(expected: np.ndarray, actual: np.ndarray) -> float:
+    """Estatística KS aproximada pelas CDFs dos bins"""
+    e = np.cumsum(expected) / max(expected.sum(), 1)
+    a = np.cumsum(actual) / max(actual.sum(), 1)
+    return float(np.max(np.abs(a - e)))
+
+class DriftMonitor:
+    """Histogramas de bins fixos por feature e para o score"""
+
+    def __init__(
+        self,
+        names: List[str],
+        edges: List[List[float]],
+        baseline_counts: List[List[int]],
+        min_observations: int = MIN_OBSERVATIONS,
+    ):
+        self.names = list(names)
+        self.min_observations = min_observations
+        n_edges = max(len(e) for e in edges)
+        # Limites em matriz (linha por série), completados com +inf: um único
+        # `edges < x` classifica todas as features de uma vez
+        self.edges = np.full((len(names), n_edges), np.inf)
+        for i, feature_edges in enumerate(edges):
+            self.edges[i, :len(feature_edges)] = feature_edges
+        self.n_bins = [len(e) + 1 for e in edges]
+        self.baseline = [np.asarray(c, dtype=np.int64) for c in baseline_counts]
+        self.counts = np.zeros((len(names), n_edges + 1), dtype=np.int64)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path: Path, min_observations: int = MIN_OBSERVATIONS) -> Optional['DriftMonitor']:
+        """Carrega o baseline salvo por train_model.py"""
+        if not path.exists():
+            return None
+        with open(path, 'r') as f:
+            baseline = json.load(f)
+        series = baseline['features'] + [baseline[SCORE_NAME]]
+        return cls(
+            [s['name'] for s in series],
+            [s['edges'] for s in series],
+            [s['counts'] for s in series],
+            min_observations,
+        )
+
+    def update(self, features: np.ndarray, scores: Optional[np.ndarray] = None):
+        """
+        Registra um lote de predições (linhas de features e seus scores).
+        Sem `scores`, só as features são contadas (ex: score que não vem da
+        floresta completa e não é comparável ao baseline).
+        """
+        values = np.asarray(features, dtype=np.float64)
+        if scores is not None:
+            values = np.column_stack([values, np.asarray(scores, dtype=np.float64)])
+        edges = self.edges[:values.shape[1]]
+        # Bin = número de limites estritamente menores que o valor
+        bins = (edges[None, :, :] < values[:, :, None]).sum(axis=2)
+        series = np.broadcast_to(np.arange(values.shape[1]), bins.shape)
+        with self._lock:
+            np.add.at(self.counts, (series.ravel(), bins.ravel()), 1)
+
+    def sketch(self) -> Dict[str, Any]:
+        """Contadores atuais, no formato aceito por `merge`"""
+        with self._lock:
+            counts = self.counts.copy()
+        return {
+            'names': self.names,
+            'counts': [counts[i, :n].tolist() for i, n in enumerate(self.n_bins)],
+        }
+
+    def merge(self, sketch: Dict[str, Any]):
+        """Soma os contadores de outro worker (mesmo baseline)"""
+        if sketch['names'] != self.names:
+            raise ValueError("Sketch gerado com outro baseline")
+        with self._lock:
+            for i, counts in enumerate(sketch['counts']):
+                if len(counts) != self.n_bins[i]:
+                    raise ValueError(f"Número de bins incompatível para {self.names[i]}")
+                self.counts[i, :len(counts)] += np.asarray(counts, dtype=np.int64)
+
+    def reset(self):
+        """Zera os contadores (ex: depois do aquecimento)"""
+        with self._lock:
+            self.counts[:] = 0
+
+    def empty_copy(self) -> 'DriftMonitor':
+        """Monitor com o mesmo baseline e contadores zerados (para agregação)"""
+        edges = [self.edges[i, :n - 1].tolist() for i, n in enumerate(self.n_bins)]
+        return DriftMonitor(self.names, edges, [b.tolist() for b in self.baseline], self.min_observations)
+
+    def report(self) -> Dict[str, Any]:
+        """PSI e KS de cada série contra o baseline"""
+        with self._lock:
+            counts = self.counts.copy()
+
+        series = {}
+        for i, name in enumerate(self.names):
+            actual = counts[i, :self.n_bins[i]]
+            if actual.sum() == 0:
+                series[name] = {'psi': None, 'ks': None, 'status': 'no_data'}
+                continue
+            psi = population_stability_index(self.baseline[i], actual)
+            series[name] = {
+                'psi': psi,
+                'ks': binned_ks(self.baseline[i], actual),
+                'status': (
+                    'insufficient_data' if actual.sum() < self.min_observations
+                    else 'significant' if psi >= PSI_SIGNIFICANT
+                    else 'moderate' if psi >= PSI_MODERATE
+                    else 'stable'
+                ),
+            }
+
+        observations = int(counts[0].sum())
+        return {
+            'observations': observations,
+            'drifted': sorted(
+                (name for name, s in series.items() if s['status'] in ('moderate', 'significant')),
+                key=lambda name: -series[name]['psi']
+            ) if observations else [],
+            'features': {name: s for name, s in series.items() if name != SCORE_NAME},
+            SCORE_NAME: series[SCORE_NAME],
+        }
@@ -0,0 +1,227 @@
+"""
+Avaliação sequencial da Random Forest com parada antecipada
+
+As árvores são avaliadas em uma sequência fixa (ou ordenada por importância)
+e a avaliação de uma transação termina assim que um limite estatístico
+indica que a classe final não pode mais mudar. A maior parte do tráfego é
+claramente legítima, então poucas árvores costumam ser suficientes.
+
+Validação offline (discordância exata contra a floresta completa):
+
+    python -m app.ml.early_exit --model ../ml/models/fraud_classifier.pkl \
+        --holdout ../ml/data/holdout.npz
+"""
+import argparse
+import json
+import logging
+import math
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import joblib
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+def hoeffding_serfling_margin(k: int, n_trees: int, delta: float) -> float:
+    """
+    Margem de erro da média de k árvores em relação à média das n_trees,
+    tratando as k primeiras como amostra sem reposição (Hoeffding-Serfling).
+    Com probabilidade >= 1 - delta a média final está a menos de `margin`.
+
+    A hipótese de amostra aleatória vale para a ordem fixa (árvores treinadas
+    de forma independente). Na ordem por importância as primeiras árvores são
+    escolhidas por concordarem com o ensemble, então a margem é só uma
+    heurística; a taxa real de discordância deve ser medida com `validate`.
+    """
+    if k >= n_trees:
+        return 0.0
+    finite_population = 1.0 - (k - 1) / n_trees
+    return math.sqrt(finite_population * math.log(2.0 / delta) / (2.0 * k))
+
+class EarlyExitForest:
+    """Avaliador sequencial com parada antecipada para RandomForestClassifier"""
+
+    def __init__(
+        self,
+        forest,
+        threshold: float = 0.5,
+        delta: float = 0.01,
+        min_trees: int = 10,
+        step: int = 5,
+        order: Optional[List[int]] = None,
+    ):
+        if order is not None and sorted(order) != list(range(len(forest.estimators_))):
+            raise ValueError("Ordem de árvores inválida para este modelo")
+
+        self.order = list(order) if order is not None else list(range(len(forest.estimators_)))
+        self.estimators = [forest.estimators_[i] for i in self.order]
+        self.n_trees = len(self.estimators)
+        self.fraud_index = list(forest.classes_).index(1)
+        self.threshold = threshold
+        self.delta = delta
+        self.min_trees = max(1, min(min_trees, self.n_trees))
+        self.step = max(1, step)
+
+        # O limite é testado várias vezes por transação; com delta dividido
+        # entre as verificações (Bonferroni), a chance de a classe mudar em
+        # qualquer uma delas fica <= delta
+        self.checks = max(1, len(self._check_points()))
+        self.delta_per_check = delta / self.checks
+
+        # Margens pré-calculadas por número de árvores avaliadas
+        self._margins = np.array([
+            hoeffding_serfling_margin(k, self.n_trees, self.delta_per_check) if k else np.inf
+            for k in range(self.n_trees + 1)
+        ])
+
+    def _check_points(self) -> List[int]:
+        """Números de árvores avaliadas em que o limite é testado"""
+        return [k for k in range(self.step, self.n_trees, self.step) if k >= self.min_trees]
+
+    def _can_stop(self, sums: np.ndarray, k: int) -> np.ndarray:
+        """Indica, por linha, se a classe final já está decidida após k árvores"""
+        remaining = self.n_trees - k
+        # Limite exato: mesmo que todas as árvores restantes votem 0 ou 1
+        lower = sums / self.n_trees
+        upper = (sums + remaining) / self.n_trees
+        exact = (upper <= self.threshold) | (lower > self.threshold)
+        # Limite estatístico sobre a média parcial
+        mean = sums / k
+        statistical = np.abs(mean - self.threshold) > self._margins[k]
+        return exact | statistical
+
+    def predict_proba(self, X) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Retorna (probabilidade de fraude, árvores usadas) para cada linha.
+        Linhas que avaliam todas as árvores têm exatamente o mesmo score da
+        floresta completa; as demais usam a média parcial.
+        """
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        n_samples = X.shape[0]
+        sums = np.zeros(n_samples)
+        trees_used = np.zeros(n_samples, dtype=np.int64)
+        active = np.arange(n_samples)
+
+        k = 0
+        while k < self.n_trees and active.size:
+            X_active = X[active]
+            for estimator in self.estimators[k:k + self.step]:
+                sums[active] += estimator.predict_proba(X_active, check_input=False)[:, self.fraud_index]
+                k += 1
+            trees_used[active] = k
+
+            if self.min_trees <= k < self.n_trees:
+                active = active[~self._can_stop(sums[active], k)]
+
+        return sums / trees_used, trees_used
+
+    def predict(self, X) -> np.ndarray:
+        proba, _ = self.predict_proba(X)
+        return (proba > self.threshold).astype(int)
+
+def importance_order(forest, X) -> List[int]:
+    """
+    Ordena as árvores pela proximidade com a floresta completa em X:
+    árvores que mais concordam com o ensemble são avaliadas primeiro.
+    """
+    X = np.ascontiguousarray(X, dtype=np.float32)
+    fraud_index = list(forest.classes_).index(1)
+    per_tree = np.stack([
+        estimator.predict_proba(X, check_input=False)[:, fraud_index]
+        for estimator in forest.estimators_
+    ])
+    full = per_tree.mean(axis=0)
+    agreement = ((per_tree > 0.5) == (full > 0.5)).mean(axis=1)
+    error = np.abs(per_tree - full).mean(axis=1)
+    # Maior concordância primeiro; desempate pelo menor erro médio
+    return [int(i) for i in np.lexsort((error, -agreement))]
+
+def load_tree_order(path: Path) -> Optional[List[int]]:
+    """Carrega a ordem de árvores salva pela validação offline"""
+    if not path.exists():
+        return None
+    with open(path, 'r') as f:
+        return json.load(f)
+
+def validate(evaluator: EarlyExitForest, forest, X, y=None) -> Dict[str, Any]:
+    """Compara o avaliador com a floresta completa em um conjunto de holdout"""
+    X = np.ascontiguousarray(X, dtype=np.float32)
+
+    start = time.perf_counter()
+    full_proba = forest.predict_proba(X)[:, evaluator.fraud_index]
+    full_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    proba, trees_used = evaluator.predict_proba(X)
+    early_time = time.perf_counter() - start
+
+    full_pred = (full_proba > evaluator.threshold).astype(int)
+    pred = (proba > evaluator.threshold).astype(int)
+    disagreements = int((full_pred != pred).sum())
+
+    report = {
+        'samples': int(len(X)),
+        'disagreements': disagreements,
+        'disagreement_rate': disagreements / len(X),
+        'mean_trees_used': float(trees_used.mean()),
+        'p50_trees_used': float(np.percentile(trees_used, 50)),
+        'p99_trees_used': float(np.percentile(trees_used, 99)),
+        'max_score_diff': float(np.abs(full_proba - proba).max()),
+        'full_forest_seconds': full_time,
+        'early_exit_seconds': early_time,
+    }
+    if y is not None:
+        y = np.asarray(y)
+        report['full_forest_accuracy'] = float((full_pred == y).mean())
+        report['early_exit_accuracy'] = float((pred == y).mean())
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description="Validação offline da avaliação com parada antecipada")
+    parser.add_argument('--model', default='../ml/models/fraud_classifier.pkl')
+    parser.add_argument('--holdout', default='../ml/data/holdout.npz',
+                        help="Arquivo .npz com arrays X e y (gerado por train_model.py)")
+    parser.add_argument('--delta', type=float, default=0.01)
+    parser.add_argument('--min-trees', type=int, default=10)
+    parser.add_argument('--step', type=int, default=5)
+    parser.add_argument('--order', choices=['fixed', 'importance'], default='fixed')
+    parser.add_argument('--order-fraction', type=float, default=0.5,
+                        help="Fração do holdout usada para escolher a ordem por importância "
+                             "(a validação usa o restante)")
+    parser.add_argument('--save-order', action='store_true',
+                        help="Salva a ordem por importância em tree_order.json ao lado do modelo")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    forest = joblib.load(args.model)
+    holdout = np.load(args.holdout)
+    X, y = holdout['X'], holdout['y']
+
+    order = None
+    if args.order == 'importance':
+        # Ordem escolhida e validada em partes disjuntas do holdout: medir a
+        # discordância nas mesmas linhas seria otimista
+        rows = np.random.default_rng(42).permutation(len(X))
+        n_order = int(len(X) * args.order_fraction)
+        if not 0 < n_order < len(X):
+            parser.error("--order-fraction deve deixar linhas para a ordem e para a validação")
+        order = importance_order(forest, X[rows[:n_order]])
+        X, y = X[rows[n_order:]], y[rows[n_order:]]
+        logger.info(f"Ordem por importância em {n_order} linhas; validação nas outras {len(X)}")
+        if args.save_order:
+            order_path = Path(args.model).parent / 'tree_order.json'
+            with open(order_path, 'w') as f:
+                json.dump(order, f)
+            logger.info(f"Ordem de árvores salva: {order_path}")
+
+    evaluator = EarlyExitForest(
+        forest, delta=args.delta, min_trees=args.min_trees, step=args.step, order=order
+    )
+    report = validate(evaluator, forest, X, y)
+    for key, value in report.items():
+        logger.info(f"{key}: {value}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Atribuição de features por contribuição de caminho nas árvores
+
+Para cada nó, a contribuição é a variação da probabilidade de fraude em
+relação ao nó pai, atribuída à feature usada na divisão do pai. As tabelas
+(folha x features, com a soma do caminho até a folha) são calculadas uma
+vez no carregamento do modelo; explicar uma predição custa apenas uma
+travessia extra por árvore até a folha:
+
+    score = bias + soma(contribuições)
+
+onde `bias` é a média das probabilidades na raiz de cada árvore.
+"""
+import logging
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+from scipy import sparse
+
+logger = logging.getLogger(__name__)
+
+class PathContributionExplainer:
+    """Explicador com tabelas de contribuição pré-calculadas por nó"""
+
+    def __init__(self, forest, feature_names: Sequence[str]):
+        self.feature_names = list(feature_names)
+        self.estimators = list(forest.estimators_)
+        self.n_trees = len(self.estimators)
+        fraud_index = list(forest.classes_).index(1)
+        n_features = forest.n_features_in_
+
+        node_counts = [estimator.tree_.node_count for estimator in self.estimators]
+        self.node_offsets = np.concatenate([[0], np.cumsum(node_counts)[:-1]]).astype(np.int64)
+
+        rows, cols, data = [], [], []
+        root_probabilities = []
+        for offset, estimator in zip(self.node_offsets, self.estimators):
+            tree = estimator.tree_
+            values = tree.value[:, 0, :]
+            totals = values.sum(axis=1)
+            node_probability = np.divide(
+                values[:, fraud_index], totals, out=np.zeros(len(totals)), where=totals > 0
+            )
+            root_probabilities.append(node_probability[0])
+
+            parent = np.full(tree.node_count, -1, dtype=np.int64)
+            internal = np.flatnonzero(tree.children_left != -1)
+            parent[tree.children_left[internal]] = internal
+            parent[tree.children_right[internal]] = internal
+
+            # Soma das contribuições do caminho raiz -> folha, subindo um
+            # nível por iteração para todas as folhas ao mesmo tempo
+            leaves = np.flatnonzero(tree.children_left == -1)
+            current = leaves.copy()
+            while True:
+                on_path = parent[current] != -1
+                if not on_path.any():
+                    break
+                node, up = current[on_path], parent[current[on_path]]
+                rows.append(leaves[on_path] + offset)
+                cols.append(tree.feature[up])
+                data.append(node_probability[node] - node_probability[up])
+                current[on_path] = up
+
+        # Tabela global (nós de todas as árvores x features); só folhas têm entradas
+        total_nodes = int(sum(node_counts))
+        self.leaf_table = sparse.coo_matrix(
+            (np.concatenate(data), (np.concatenate(rows), np.concatenate(cols))),
+            shape=(total_nodes, n_features)
+        ).tocsr()
+        self.root_probabilities = np.asarray(root_probabilities)
+        logger.info(
+            f"Tabelas de contribuição pré-calculadas "
+            f"({self.leaf_table.nnz} entradas em {self.n_trees} árvores)"
+        )
+
+    def contributions(self, X, time_cap_ms: Optional[float] = None):
+        """
+        Retorna (contribuições por linha e feature, bias, árvores usadas).
+        Com `time_cap_ms`, para ao estourar o limite e usa as árvores já
+        percorridas (média parcial).
+        """
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        start = time.perf_counter()
+
+        leaves = []
+        for offset, estimator in zip(self.node_offsets, self.estimators):
+            leaves.append(estimator.tree_.apply(X) + offset)
+            if time_cap_ms is not None and (time.perf_counter() - start) * 1000.0 >= time_cap_ms:
+                break
+
+        trees_used = len(leaves)
+        n_samples = X.shape[0]
+        # Indicador (linha x folha alcançada) vezes a tabela de contribuições
+        indicator = sparse.csr_matrix(
+            (np.ones(n_samples * trees_used), np.stack(leaves, axis=1).ravel(),
+             np.arange(0, n_samples * trees_used + 1, trees_used)),
+            shape=(n_samples, self.leaf_table.shape[0])
+        )
+        contributions = (indicator @ self.leaf_table).toarray() / trees_used
+
+        bias = float(self.root_probabilities[:trees_used].mean())
+        return contributions, bias, trees_used
+
+    def explain(self, X, top_k: int = 5, time_cap_ms: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Top-k contribuições (em valor absoluto) de cada linha de X"""
+        X = np.asarray(X)
+        contributions, bias, trees_used = self.contributions(X, time_cap_ms)
+        top_k = max(1, min(top_k, len(self.feature_names)))
+
+        explanations = []
+        for row, row_contributions in zip(X, contributions):
+            top = np.argsort(-np.abs(row_contributions))[:top_k]
+            explanations.append({
+                'bias': bias,
+                'contributions': [
+                    {
+                        'feature': self.feature_names[i],
+                        'value': float(row[i]),
+                        'contribution': float(row_contributions[i]),
+                    }
+                    for i in top
+                ],
+                'trees_used': trees_used,
+                'complete': trees_used == self.n_trees,
+            })
+        return explanations
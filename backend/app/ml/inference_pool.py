@@ -0,0 +1,50 @@
+"""
+Pool limitado de workers de inferência com respeito a prazos
+"""
+from fastapi.concurrency import run_in_threadpool
+from typing import Any, Callable, Optional
+import asyncio
+
+from app.core.config import settings
+from app.core.deadline import Deadline, DeadlineExceeded, deadline_metrics
+
+class InferencePool:
+    """
+    Limita quantas inferências rodam ao mesmo tempo. Requisições com prazo
+    esperam na fila só enquanto o prazo permitir: trabalho expirado nunca
+    chega a ocupar um worker.
+    """
+    
+    def __init__(self, workers: int = settings.INFERENCE_WORKERS):
+        self.workers = workers
+        self._semaphore: Optional[asyncio.Semaphore] = None
+    
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        # Criado sob demanda para ficar associado ao event loop da aplicação
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.workers)
+        return self._semaphore
+    
+    async def run(self, fn: Callable[..., Any], *args, deadline: Optional[Deadline] = None, **kwargs) -> Any:
+        """Executa `fn` em um worker; lança DeadlineExceeded se o prazo expirar na fila"""
+        if deadline is None:
+            async with self.semaphore:
+                return await run_in_threadpool(fn, *args, **kwargs)
+        
+        try:
+            await asyncio.wait_for(self.semaphore.acquire(), timeout=max(deadline.remaining_ms(), 0) / 1000.0)
+        except asyncio.TimeoutError:
+            deadline_metrics.increment('expired_in_queue')
+            raise DeadlineExceeded()
+        
+        try:
+            if deadline.expired():
+                deadline_metrics.increment('expired_in_queue')
+                raise DeadlineExceeded()
+            return await run_in_threadpool(fn, *args, deadline=deadline, **kwargs)
+        finally:
+            self.semaphore.release()
+
+# Singleton compartilhado pelos endpoints
+inference_pool = InferencePool()
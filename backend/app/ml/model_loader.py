@@ -6,8 +6,18 @@ import json
 import numpy as np
 from pathlib import Path
 import os
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Tuple
 import logging
+import threading
+import time
+
+from app.core.config import settings
+from app.core.deadline import Deadline, deadline_metrics
+from app.ml.cascade import ScoringCascade
+from app.ml.compact_forest import CompactForest
+from app.ml.drift import DriftMonitor
+from app.ml.early_exit import EarlyExitForest, load_tree_order
+from app.ml.explain import PathContributionExplainer
 
 logger = logging.getLogger(__name__)
 
@@ -18,6 +28,16 @@ class FraudClassifierModel:
         self.model = None
         self.amount_scaler = None
         self.feature_columns = None
+        self.early_exit = None
+        self.compact_forest = None
+        self.cascade = None
+        self.explainer = None
+        self.drift_monitor = None
+        self.fraud_index = 1  # Coluna da classe 1 em predict_proba
+        self.inference_latency_ms = None  # Média móvel da inferência completa
+        self._last_full_inference = 0.0  # time.monotonic() da última medição completa
+        # Estimativa de latência compartilhada pelos workers do pool
+        self._latency_lock = threading.Lock()
         self.is_loaded = False
         
     def load_model(self):
@@ -45,6 +65,8 @@ class FraudClassifierModel:
             
             # Carregar modelo
             self.model = joblib.load(model_path)
+            if hasattr(self.model, 'classes_'):
+                self.fraud_index = list(self.model.classes_).index(1)
             logger.info(f"Modelo carregado de: {model_path}")
             
             # Carregar scaler
@@ -67,6 +89,27 @@ class FraudClassifierModel:
                     f'V{i}' for i in range(1, 29)
                 ] + ['Amount_scaled', 'hour_sin', 'hour_cos', 'day_sin', 'day_cos']
             
+            if settings.SCORING_MODE == "early_exit":
+                self.early_exit = self._build_early_exit(model_path)
+            elif settings.SCORING_MODE == "compact":
+                self.compact_forest = self._build_compact_forest(model_path)
+            
+            if settings.EXPLAIN_ENABLED and hasattr(self.model, 'estimators_'):
+                # Tabelas de contribuição calculadas uma vez, no carregamento
+                self.explainer = PathContributionExplainer(self.model, self.feature_columns)
+            
+            if settings.CASCADE_ENABLED:
+                self.cascade = ScoringCascade.load(model_path.parent)
+                if self.cascade is None:
+                    logger.warning("Pré-filtro da cascata não encontrado. Usando apenas a floresta.")
+            
+            if settings.DRIFT_MONITOR_ENABLED:
+                self.drift_monitor = DriftMonitor.load(
+                    model_path.parent / 'drift_baseline.json', settings.DRIFT_MIN_OBSERVATIONS
+                )
+                if self.drift_monitor is None:
+                    logger.warning("drift_baseline.json não encontrado. Monitor de drift desativado.")
+            
             self.is_loaded = True
             logger.info("✅ Modelo ML carregado com sucesso")
             
@@ -78,6 +121,33 @@ class FraudClassifierModel:
             else:
                 raise
     
+    def _build_early_exit(self, model_path: Path) -> EarlyExitForest:
+        """Cria o avaliador sequencial com parada antecipada"""
+        order = None
+        if settings.EARLY_EXIT_TREE_ORDER == "importance":
+            order = load_tree_order(model_path.parent / 'tree_order.json')
+            if order is None:
+                logger.warning("tree_order.json não encontrado. Usando ordem fixa das árvores.")
+        
+        evaluator = EarlyExitForest(
+            self.model,
+            delta=settings.EARLY_EXIT_DELTA,
+            min_trees=settings.EARLY_EXIT_MIN_TREES,
+            step=settings.EARLY_EXIT_STEP,
+            order=order
+        )
+        logger.info(f"Parada antecipada ativa (delta={evaluator.delta}, min_trees={evaluator.min_trees})")
+        return evaluator
+    
+    def _build_compact_forest(self, model_path: Path) -> CompactForest:
+        """Carrega a floresta compacta exportada ou converte o modelo em memória"""
+        compact = CompactForest.load(model_path.parent / 'compact_forest.npz')
+        if compact is None:
+            logger.warning("compact_forest.npz não encontrado. Convertendo o modelo na inicialização.")
+            compact = CompactForest.from_sklearn(self.model, settings.COMPACT_FOREST_QUANTIZATION)
+        logger.info(f"Floresta compacta ativa ({compact.quantization}, {compact.nbytes / 1e6:.2f} MB)")
+        return compact
+    
     def preprocess(self, transaction_data: Dict[str, Any]) -> np.ndarray:
         """Pré-processa dados da transação para formato do modelo"""
         amount = transaction_data['amount']
@@ -163,38 +233,255 @@ class FraudClassifierModel:
         
         return features
     
-    def predict(self, transaction_data: Dict[str, Any]) -> Dict[str, Any]:
+    def predict(
+        self,
+        transaction_data: Dict[str, Any],
+        deadline: Optional[Deadline] = None,
+        explain: bool = False,
+        top_k: Optional[int] = None
+    ) -> Dict[str, Any]:
         """
-        Classifica transação e retorna resultado
+        Classifica transação e retorna resultado.
+        Com prazo, degrada para um subconjunto de árvores (ou para a
+        heurística) se o orçamento restante não comporta a inferência completa.
+        Com `explain`, inclui as top-k contribuições de features.
         """
         if not self.is_loaded:
             # Modo dummy para desenvolvimento
             logger.warning("Modelo não carregado. Retornando predição dummy.")
-            amount = transaction_data.get('amount', 100)
-            hour = transaction_data.get('hour', 12)
-            
-            # Heurística simples: valores altos ou horários suspeitos = possível fraude
-            fraud_score = 0.0
-            if amount > 5000:
-                fraud_score += 0.3
-            if hour < 6 or hour > 22:
-                fraud_score += 0.2
-            if amount > 10000:
-                fraud_score += 0.3
-            
-            fraud_score = min(fraud_score, 0.95)
-            classification = 1 if fraud_score > 0.5 else 0
+            return self._build_result(*self._heuristic_score(transaction_data))
+        
+        # Pré-processar
+        features = self.preprocess(transaction_data)
+        
+        if deadline is not None and self.inference_latency_ms is not None:
+            remaining_ms = deadline.remaining_ms() - settings.DEADLINE_SAFETY_MARGIN_MS
+            if self._should_degrade(remaining_ms):
+                return self._predict_degraded(transaction_data, features, remaining_ms)
+        
+        # Predição
+        start = time.perf_counter()
+        probabilities, classifications, extras = self._score_features(features)
+        self._observe_latency((time.perf_counter() - start) * 1000.0, full=True)
+        self._record_drift(features, probabilities)
+        
+        result = self._build_result(float(probabilities[0]), int(classifications[0]), extras[0])
+        
+        if explain and self._explainable(extras[0]):
+            time_cap_ms = settings.EXPLAIN_TIME_CAP_MS
+            if deadline is not None:
+                time_cap_ms = min(time_cap_ms, deadline.remaining_ms() - settings.DEADLINE_SAFETY_MARGIN_MS)
+            # Sem orçamento para explicar: responde só com a classificação
+            if time_cap_ms > 0:
+                result['explanation'] = self.explainer.explain(
+                    features, top_k or settings.EXPLAIN_TOP_K, time_cap_ms
+                )[0]
+        
+        return result
+    
+    def _explainable(self, extra: Dict[str, Any]) -> bool:
+        """
+        A explicação decompõe o score da floresta completa; se o score veio
+        do pré-filtro ou de parte das árvores, bias + contribuições não
+        batem com ele e a explicação é omitida
+        """
+        if self.explainer is None or extra.get('decided_by', 'forest') != 'forest':
+            return False
+        return extra.get('trees_used', self.explainer.n_trees) >= self.explainer.n_trees
+    
+    def predict_fallback(self, transaction_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Resposta degradada imediata (heurística) quando o prazo expirou na fila"""
+        result = self._build_result(
+            *self._heuristic_score(transaction_data),
+            {'decided_by': 'heuristic'}
+        )
+        result['degraded'] = True
+        return result
+    
+    def _should_degrade(self, remaining_ms: float) -> bool:
+        """
+        Degrada se o orçamento não comporta a latência estimada. Como a
+        estimativa só muda com inferências completas, uma amostra lenta
+        poderia manter a degradação para sempre: se a floresta completa não
+        é medida há DEADLINE_LATENCY_PROBE_SECONDS, esta requisição a executa
+        (no máximo uma por intervalo pode perder o prazo).
+        """
+        with self._latency_lock:
+            if remaining_ms >= self.inference_latency_ms:
+                return False
+            now = time.monotonic()
+            if now - self._last_full_inference < settings.DEADLINE_LATENCY_PROBE_SECONDS:
+                return True
+            # Só uma requisição por intervalo é escolhida para a medição
+            self._last_full_inference = now
+        deadline_metrics.increment('latency_probes')
+        return False
+    
+    def _predict_degraded(self, transaction_data: Dict[str, Any], features: np.ndarray, remaining_ms: float) -> Dict[str, Any]:
+        """Escolhe o avaliador mais completo que cabe no orçamento restante"""
+        estimators = getattr(self.model, 'estimators_', [])
+        n_trees = min(settings.DEADLINE_REDUCED_TREES, len(estimators))
+        # Custo estimado proporcional ao número de árvores
+        reduced_cost_ms = self.inference_latency_ms * n_trees / max(len(estimators), 1)
+        
+        if n_trees and remaining_ms >= reduced_cost_ms:
+            deadline_metrics.increment('degraded_reduced_forest')
+            X = np.ascontiguousarray(features, dtype=np.float32)
+            start = time.perf_counter()
+            fraud_score = float(np.mean([
+                estimator.predict_proba(X, check_input=False)[0, self.fraud_index]
+                for estimator in estimators[:n_trees]
+            ]))
+            # Tempo do subconjunto, escalado para a floresta inteira, também
+            # atualiza a estimativa (ela pode cair sem uma inferência completa)
+            self._observe_latency((time.perf_counter() - start) * 1000.0 * len(estimators) / n_trees)
+            result = self._build_result(
+                fraud_score, int(fraud_score > 0.5),
+                {'trees_used': n_trees, 'decided_by': 'reduced_forest'}
+            )
+            result['degraded'] = True
+            return result
+        
+        deadline_metrics.increment('degraded_heuristic')
+        return self.predict_fallback(transaction_data)
+    
+    def _observe_latency(self, elapsed_ms: float, alpha: float = 0.1, full: bool = False):
+        """
+        Atualiza a média móvel exponencial da latência de inferência
+        (`full`: medição da floresta completa, que adia a próxima sonda)
+        """
+        with self._latency_lock:
+            if self.inference_latency_ms is None:
+                self.inference_latency_ms = elapsed_ms
+            else:
+                self.inference_latency_ms += alpha * (elapsed_ms - self.inference_latency_ms)
+            if full:
+                self._last_full_inference = time.monotonic()
+    
+    def _record_drift(self, features: np.ndarray, probabilities: np.ndarray):
+        """
+        Atualiza os histogramas do monitor de drift (predições completas).
+        O baseline do score vem da floresta completa; com a cascata (score do
+        pré-filtro) ou a parada antecipada (média parcial), só as features
+        são registradas, para o modo de inferência não aparecer como drift.
+        """
+        if self.drift_monitor is None:
+            return
+        if self.cascade is None and self.early_exit is None:
+            self.drift_monitor.update(features, probabilities)
         else:
-            # Pré-processar
-            features = self.preprocess(transaction_data)
-            
-            # Predição
-            prediction = self.model.predict(features)[0]
-            probabilities = self.model.predict_proba(features)[0]
-            
-            classification = int(prediction)
-            fraud_score = float(probabilities[1])
+            self.drift_monitor.update(features)
+    
+    def predict_batch(
+        self,
+        transactions: List[Dict[str, Any]],
+        explain: Optional[List[bool]] = None,
+        top_k: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Classifica várias transações com uma única chamada ao modelo.
+        Usado pelo canal WebSocket para amortizar o custo por predição.
+        `explain` indica, por transação, se a explicação deve ser incluída;
+        as linhas marcadas são explicadas juntas, em uma única passada.
+        """
+        if not transactions:
+            return []
+        
+        if not self.is_loaded:
+            logger.warning("Modelo não carregado. Retornando predições dummy.")
+            return [
+                self._build_result(*self._heuristic_score(transaction_data))
+                for transaction_data in transactions
+            ]
+        
+        features = np.vstack([self.preprocess(t) for t in transactions])
+        probabilities, classifications, extras = self._score_features(features)
+        self._record_drift(features, probabilities)
+        
+        results = [
+            self._build_result(float(p), int(c), extra)
+            for p, c, extra in zip(probabilities, classifications, extras)
+        ]
+        
+        if explain is not None and self.explainer is not None:
+            rows = [i for i, flag in enumerate(explain) if flag and self._explainable(extras[i])]
+            if rows:
+                explanations = self.explainer.explain(
+                    features[rows], top_k or settings.EXPLAIN_TOP_K, settings.EXPLAIN_BATCH_TIME_CAP_MS
+                )
+                for i, explanation in zip(rows, explanations):
+                    results[i]['explanation'] = explanation
+        
+        return results
+    
+    def _score_features(self, features: np.ndarray) -> Tuple[np.ndarray, np.ndarray, List[Dict[str, Any]]]:
+        """
+        Calcula probabilidade de fraude, classe e metadados de inferência
+        de cada linha. Com a cascata ativa, só a faixa incerta do
+        pré-filtro é avaliada pela floresta.
+        """
+        if self.cascade is None:
+            probabilities, extras = self._score_forest(features)
+            # Mesmo critério de model.predict(): argmax entre as duas classes
+            return probabilities, (probabilities > 0.5).astype(int), extras
+        
+        prefilter_scores = self.cascade.score(features)
+        uncertain = self.cascade.uncertain_mask(prefilter_scores)
+        
+        probabilities = prefilter_scores.astype(np.float64)
+        # Decididas pelo pré-filtro: abaixo de low = legítima, acima de high = fraude
+        classifications = (prefilter_scores >= self.cascade.low_threshold).astype(int)
+        extras: List[Dict[str, Any]] = [{'decided_by': 'prefilter'} for _ in range(len(features))]
+        
+        if uncertain.any():
+            forest_probabilities, forest_extras = self._score_forest(features[uncertain])
+            probabilities[uncertain] = forest_probabilities
+            classifications[uncertain] = (forest_probabilities > 0.5).astype(int)
+            for i, extra in zip(np.flatnonzero(uncertain), forest_extras):
+                extras[i] = {**extra, 'decided_by': 'forest'}
+        
+        return probabilities, classifications, extras
+    
+    def _score_forest(self, features: np.ndarray) -> Tuple[np.ndarray, List[Dict[str, Any]]]:
+        """Probabilidade de fraude segundo a Random Forest (completa, compacta ou com parada antecipada)"""
+        if self.early_exit is not None:
+            probabilities, trees_used = self.early_exit.predict_proba(features)
+            return probabilities, [{'trees_used': int(n)} for n in trees_used]
         
+        if self.compact_forest is not None:
+            probabilities = self.compact_forest.predict_proba(features)
+            return probabilities, [{'trees_used': self.compact_forest.n_trees}] * len(probabilities)
+        
+        probabilities = self.model.predict_proba(features)[:, self.fraud_index]
+        n_trees = len(getattr(self.model, 'estimators_', []))
+        extra = {'trees_used': n_trees} if n_trees else {}
+        return probabilities, [extra] * len(probabilities)
+    
+    def _heuristic_score(self, transaction_data: Dict[str, Any]) -> Tuple[float, int]:
+        """Heurística simples usada quando não há modelo carregado"""
+        amount = transaction_data.get('amount', 100)
+        hour = transaction_data.get('hour', 12)
+        
+        # Heurística simples: valores altos ou horários suspeitos = possível fraude
+        fraud_score = 0.0
+        if amount > 5000:
+            fraud_score += 0.3
+        if hour < 6 or hour > 22:
+            fraud_score += 0.2
+        if amount > 10000:
+            fraud_score += 0.3
+        
+        fraud_score = min(fraud_score, 0.95)
+        classification = 1 if fraud_score > 0.5 else 0
+        return fraud_score, classification
+    
+    def _build_result(
+        self,
+        fraud_score: float,
+        classification: int,
+        extra: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """Monta o dicionário de resultado a partir do score"""
         # Determinar nível de confiança
         if fraud_score > 0.8 or fraud_score < 0.2:
             confidence = 'high'
@@ -213,15 +500,19 @@ class FraudClassifierModel:
         else:
             risk_level = 'low'
         
+        details = {
+            'legitimate_probability': float(1 - fraud_score),
+            'fraud_probability': float(fraud_score),
+            'risk_level': risk_level
+        }
+        if extra:
+            details.update(extra)
+        
         return {
             'classification': classification,
             'fraud_score': float(fraud_score),
             'confidence': confidence,
-            'details': {
-                'legitimate_probability': float(1 - fraud_score),
-                'fraud_probability': float(fraud_score),
-                'risk_level': risk_level
-            }
+            'details': details
         }
 
 # Singleton para carregar modelo uma vez
@@ -0,0 +1,125 @@
+"""
+Benchmark de throughput dos modos de inferência
+
+Compara a floresta completa com a cascata (pré-filtro + floresta), com a
+parada antecipada e com a floresta compacta em um corpus com proporção realista de fraudes,
+reamostrado a partir do holdout salvo por train_model.py.
+
+    cd backend
+    python -m benchmarks.bench_scoring --model-dir ../ml/models \
+        --holdout ../ml/data/holdout.npz --fraud-ratio 0.0017
+"""
+import argparse
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import joblib
+import numpy as np
+
+from app.ml.cascade import ScoringCascade
+from app.ml.compact_forest import CompactForest
+from app.ml.early_exit import EarlyExitForest
+from app.ml.model_loader import FraudClassifierModel
+
+def build_corpus(X: np.ndarray, y: np.ndarray, size: int, fraud_ratio: float, seed: int):
+    """Reamostra o holdout para o tamanho e a proporção de fraudes desejados"""
+    rng = np.random.default_rng(seed)
+    fraud_idx = np.flatnonzero(y == 1)
+    legit_idx = np.flatnonzero(y == 0)
+    n_fraud = int(round(size * fraud_ratio))
+    idx = np.concatenate([
+        rng.choice(fraud_idx, n_fraud, replace=True),
+        rng.choice(legit_idx, size - n_fraud, replace=True),
+    ])
+    rng.shuffle(idx)
+    return np.ascontiguousarray(X[idx], dtype=np.float64), y[idx]
+
+def build_scorer(forest, cascade=None, early_exit=None, compact_forest=None) -> FraudClassifierModel:
+    scorer = FraudClassifierModel()
+    scorer.model = forest
+    scorer.cascade = cascade
+    scorer.early_exit = early_exit
+    scorer.compact_forest = compact_forest
+    scorer.is_loaded = True
+    return scorer
+
+def run(scorer: FraudClassifierModel, X: np.ndarray, batch_size: int) -> Dict:
+    probabilities: List[np.ndarray] = []
+    classifications: List[np.ndarray] = []
+    extras: List[Dict] = []
+
+    start = time.perf_counter()
+    for i in range(0, len(X), batch_size):
+        p, c, e = scorer._score_features(X[i:i + batch_size])
+        probabilities.append(p)
+        classifications.append(c)
+        extras.extend(e)
+    elapsed = time.perf_counter() - start
+
+    return {
+        'seconds': elapsed,
+        'rows_per_second': len(X) / elapsed,
+        'classifications': np.concatenate(classifications),
+        'prefilter_fraction': float(np.mean([e.get('decided_by') == 'prefilter' for e in extras])),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark dos modos de inferência")
+    parser.add_argument('--model-dir', default='../ml/models')
+    parser.add_argument('--holdout', default='../ml/data/holdout.npz')
+    parser.add_argument('--size', type=int, default=20000)
+    parser.add_argument('--fraud-ratio', type=float, default=0.0017,
+                        help="Proporção de fraudes (creditcard.csv: ~0.17%%)")
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 256])
+    parser.add_argument('--single-limit', type=int, default=2000,
+                        help="Máximo de linhas avaliadas com batch_size=1")
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    model_dir = Path(args.model_dir)
+    forest = joblib.load(model_dir / 'fraud_classifier.pkl')
+    # Uma thread por predição, como no caminho de requisição
+    if hasattr(forest, 'n_jobs'):
+        forest.n_jobs = 1
+    cascade = ScoringCascade.load(model_dir)
+    early_exit = EarlyExitForest(forest)
+    compact_forest = CompactForest.load(model_dir / 'compact_forest.npz') or CompactForest.from_sklearn(forest)
+
+    holdout = np.load(args.holdout)
+    X, y = build_corpus(holdout['X'], holdout['y'], args.size, args.fraud_ratio, args.seed)
+
+    scorers = {
+        'forest': build_scorer(forest),
+        'early_exit': build_scorer(forest, early_exit=early_exit),
+        f'compact_{compact_forest.quantization}': build_scorer(forest, compact_forest=compact_forest),
+    }
+    if cascade is not None:
+        scorers['cascade'] = build_scorer(forest, cascade=cascade)
+        scorers['cascade+early_exit'] = build_scorer(forest, cascade=cascade, early_exit=early_exit)
+        scorers['cascade+compact'] = build_scorer(forest, cascade=cascade, compact_forest=compact_forest)
+    else:
+        print("Aviso: prefilter.pkl/cascade_config.json não encontrados; cascata ignorada")
+
+    print(f"Corpus: {len(X)} transações, {int(y.sum())} fraudes ({y.mean():.4%})")
+    for batch_size in args.batch_sizes:
+        X_run, y_run = (X[:args.single_limit], y[:args.single_limit]) if batch_size == 1 else (X, y)
+        print(f"\nbatch_size={batch_size} ({len(X_run)} transações)")
+        baseline = None
+        for name, scorer in scorers.items():
+            result = run(scorer, X_run, batch_size)
+            if baseline is None:
+                baseline = result
+            agreement = float((result['classifications'] == baseline['classifications']).mean())
+            frauds = y_run == 1
+            recall = float(result['classifications'][frauds].mean()) if frauds.any() else float('nan')
+            print(
+                f"  {name:<20} {result['rows_per_second']:>10.0f} tx/s"
+                f"  speedup={baseline['seconds'] / result['seconds']:>5.2f}x"
+                f"  concordância={agreement:.4%}"
+                f"  recall={recall:.3f}"
+                f"  decididas_pré-filtro={result['prefilter_fraction']:.2%}"
+            )
+
+if __name__ == "__main__":
+    main()
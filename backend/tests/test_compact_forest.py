@@ -0,0 +1,70 @@
+"""Floresta compacta: decisões idênticas às da floresta original"""
+import numpy as np
+import pytest
+from sklearn.datasets import make_classification
+from sklearn.ensemble import RandomForestClassifier
+
+from app.ml.compact_forest import QUANTIZATIONS, CompactForest
+
+@pytest.fixture(scope="module")
+def forest_and_data():
+    X, y = make_classification(
+        n_samples=2000, n_features=8, n_informative=5, weights=[0.9], random_state=0
+    )
+    forest = RandomForestClassifier(n_estimators=15, max_depth=8, random_state=0)
+    forest.fit(X, y)
+    return forest, X
+
+def boundary_inputs(forest, X):
+    """Linhas com valores exatamente nos limiares (em float32) e vizinhos"""
+    rng = np.random.default_rng(0)
+    rows = []
+    for estimator in forest.estimators_[:3]:
+        tree = estimator.tree_
+        for node in np.flatnonzero(tree.children_left != -1)[:40]:
+            t32 = np.float32(tree.threshold[node])
+            for value in (np.nextafter(t32, np.float32(-np.inf)), t32, np.nextafter(t32, np.float32(np.inf))):
+                row = X[rng.integers(len(X))].copy()
+                row[tree.feature[node]] = value
+                rows.append(row)
+    return np.asarray(rows)
+
+@pytest.mark.parametrize("quantization", QUANTIZATIONS)
+def test_scores_match_original_forest(forest_and_data, quantization):
+    forest, X = forest_and_data
+    compact = CompactForest.from_sklearn(forest, quantization)
+    X_test = np.vstack([X, boundary_inputs(forest, X)])
+
+    expected = forest.predict_proba(X_test)[:, 1]
+    scores = compact.predict_proba(X_test)
+
+    # Mesmas folhas em todas as árvores: só o arredondamento float32 das folhas difere
+    np.testing.assert_allclose(scores, expected, atol=1e-6)
+    assert ((scores > 0.5) == (expected > 0.5)).all()
+
+@pytest.mark.parametrize("quantization", QUANTIZATIONS)
+def test_save_and_load(forest_and_data, quantization, tmp_path):
+    forest, X = forest_and_data
+    compact = CompactForest.from_sklearn(forest, quantization)
+    path = tmp_path / "compact_forest.npz"
+    compact.save(path)
+
+    loaded = CompactForest.load(path)
+    assert loaded.quantization == quantization
+    np.testing.assert_array_equal(loaded.predict_proba(X), compact.predict_proba(X))
+
+def test_uint16_is_smaller_than_float32(forest_and_data):
+    forest, _ = forest_and_data
+    compact = CompactForest.from_sklearn(forest, 'uint16')
+    assert compact.bin_edges.dtype == np.float32
+    assert compact.nodes.itemsize == 8
+    assert compact.nbytes < CompactForest.from_sklearn(forest, 'float32').nbytes
+
+def test_int16_alias(forest_and_data):
+    forest, _ = forest_and_data
+    assert CompactForest.from_sklearn(forest, 'int16').quantization == 'uint16'
+
+def test_invalid_quantization(forest_and_data):
+    forest, _ = forest_and_data
+    with pytest.raises(ValueError):
+        CompactForest.from_sklearn(forest, 'int8')
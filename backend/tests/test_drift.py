@@ -0,0 +1,91 @@
+"""Monitor de drift: merge de sketches e classificação do relatório"""
+import numpy as np
+import pytest
+
+from app.ml.drift import SCORE_NAME, DriftMonitor
+
+EDGES = [-1.0, -0.5, 0.0, 0.5, 1.0]
+
+def baseline_counts(values):
+    return np.bincount(np.searchsorted(EDGES, values, side='left'), minlength=len(EDGES) + 1).tolist()
+
+def make_monitor(min_observations=100):
+    rng = np.random.default_rng(0)
+    reference = rng.normal(size=(10000, 3))
+    return DriftMonitor(
+        ['a', 'b', SCORE_NAME],
+        [EDGES] * 3,
+        [baseline_counts(reference[:, i]) for i in range(3)],
+        min_observations,
+    )
+
+def test_bin_matches_baseline_convention():
+    monitor = make_monitor()
+    # Valor igual a um limite cai no bin inferior, como em np.searchsorted
+    monitor.update(np.array([[0.0, 1.5]]), np.array([-2.0]))
+    counts = monitor.sketch()['counts']
+    assert counts[0] == baseline_counts([0.0])
+    assert counts[1] == baseline_counts([1.5])
+    assert counts[2] == baseline_counts([-2.0])
+
+def test_merge_equals_combined_updates():
+    rng = np.random.default_rng(1)
+    features, scores = rng.normal(size=(500, 2)), rng.normal(size=500)
+
+    combined = make_monitor()
+    combined.update(features, scores)
+    first, second = make_monitor(), make_monitor()
+    first.update(features[:200], scores[:200])
+    second.update(features[200:], scores[200:])
+
+    aggregate = first.empty_copy()
+    aggregate.merge(first.sketch())
+    aggregate.merge(second.sketch())
+    assert aggregate.sketch() == combined.sketch()
+
+def test_merge_rejects_other_baseline():
+    monitor = make_monitor()
+    sketch = monitor.sketch()
+
+    with pytest.raises(ValueError):
+        monitor.merge({**sketch, 'names': ['a', 'c', SCORE_NAME]})
+    with pytest.raises(ValueError):
+        monitor.merge({**sketch, 'counts': [c[:-1] for c in sketch['counts']]})
+
+def test_report_statuses():
+    rng = np.random.default_rng(2)
+    monitor = make_monitor()
+    # 'a' sem mudança, 'b' deslocada; sem scores
+    features = np.column_stack([rng.normal(size=2000), rng.normal(loc=1.5, size=2000)])
+    monitor.update(features)
+    report = monitor.report()
+
+    assert report['observations'] == 2000
+    assert report['features']['a']['status'] == 'stable'
+    assert report['features']['b']['status'] == 'significant'
+    assert report[SCORE_NAME]['status'] == 'no_data'
+    assert report['drifted'] == ['b']
+
+def test_report_insufficient_data():
+    monitor = make_monitor(min_observations=1000)
+    monitor.update(np.full((50, 2), 3.0), np.full(50, 3.0))
+    report = monitor.report()
+
+    assert report['features']['a']['psi'] > 1.0
+    assert report['features']['a']['status'] == 'insufficient_data'
+    assert report['drifted'] == []
+
+def test_drifted_sorted_by_psi():
+    rng = np.random.default_rng(3)
+    monitor = make_monitor()
+    monitor.update(
+        np.column_stack([rng.normal(loc=0.6, size=3000), rng.normal(loc=2.0, size=3000)]),
+        rng.normal(loc=1.0, size=3000),
+    )
+    report = monitor.report()
+    psi = {name: report['features'][name]['psi'] for name in ('a', 'b')}
+    psi[SCORE_NAME] = report[SCORE_NAME]['psi']
+
+    assert report['drifted'] == sorted(psi, key=lambda name: -psi[name])
+    monitor.reset()
+    assert monitor.report()['observations'] == 0
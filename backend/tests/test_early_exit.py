@@ -0,0 +1,84 @@
+"""Parada antecipada: limites exato e estatístico"""
+import numpy as np
+import pytest
+from sklearn.datasets import make_classification
+from sklearn.ensemble import RandomForestClassifier
+
+from app.ml.early_exit import EarlyExitForest, hoeffding_serfling_margin, importance_order
+
+@pytest.fixture(scope="module")
+def forest_and_data():
+    X, y = make_classification(
+        n_samples=3000, n_features=10, n_informative=6, weights=[0.9], random_state=0
+    )
+    forest = RandomForestClassifier(n_estimators=60, max_depth=6, random_state=0)
+    forest.fit(X[:2000], y[:2000])
+    return forest, X[2000:]
+
+def full_scores(forest, X):
+    return forest.predict_proba(X.astype(np.float32))[:, list(forest.classes_).index(1)]
+
+def test_margin():
+    assert hoeffding_serfling_margin(100, 100, 0.01) == 0.0
+    margins = [hoeffding_serfling_margin(k, 100, 0.01) for k in range(1, 100)]
+    assert all(a > b for a, b in zip(margins, margins[1:]))
+    # Delta menor, margem maior
+    assert hoeffding_serfling_margin(10, 100, 0.001) > hoeffding_serfling_margin(10, 100, 0.01)
+
+def test_delta_split_across_checks(forest_and_data):
+    forest, _ = forest_and_data
+    evaluator = EarlyExitForest(forest, delta=0.01, min_trees=10, step=5)
+    # Verificações em 10, 15, ..., 55 árvores
+    assert evaluator.checks == 10
+    assert evaluator.delta_per_check == pytest.approx(0.001)
+    assert evaluator._margins[10] == pytest.approx(hoeffding_serfling_margin(10, 60, 0.001))
+
+def test_exact_bound():
+    class Forest:
+        estimators_ = [None] * 10
+        classes_ = [0, 1]
+
+    # Margem estatística infinita: só o limite exato decide
+    evaluator = EarlyExitForest(Forest(), delta=0.01, min_trees=1, step=1)
+    evaluator._margins[:] = np.inf
+    sums = np.array([0.0, 6.0, 3.0, 1.0])
+    # Após 6 árvores restam 4: [0, 0.4], [0.6, 1], [0.3, 0.7], [0.1, 0.5]
+    np.testing.assert_array_equal(evaluator._can_stop(sums, 6), [True, True, False, True])
+
+def test_statistical_bound():
+    class Forest:
+        estimators_ = [None] * 100
+        classes_ = [0, 1]
+
+    evaluator = EarlyExitForest(Forest(), delta=0.01, min_trees=10, step=5)
+    margin = evaluator._margins[20]
+    sums = 20 * np.array([0.5 - margin - 1e-9, 0.5 - margin + 1e-3, 0.5 + margin + 1e-9])
+    np.testing.assert_array_equal(evaluator._can_stop(sums, 20), [True, False, True])
+
+def test_exact_bound_never_changes_the_class(forest_and_data):
+    forest, X = forest_and_data
+    evaluator = EarlyExitForest(forest, min_trees=5, step=5)
+    evaluator._margins[:] = np.inf
+    proba, trees_used = evaluator.predict_proba(X)
+    expected = full_scores(forest, X)
+
+    np.testing.assert_array_equal(proba > 0.5, expected > 0.5)
+    complete = trees_used == evaluator.n_trees
+    np.testing.assert_allclose(proba[complete], expected[complete])
+
+def test_statistical_bound_disagreement(forest_and_data):
+    forest, X = forest_and_data
+    evaluator = EarlyExitForest(forest, delta=0.01, min_trees=10, step=5)
+    proba, trees_used = evaluator.predict_proba(X)
+
+    assert trees_used.min() >= 10
+    assert trees_used.mean() < evaluator.n_trees
+    assert ((proba > 0.5) != (full_scores(forest, X) > 0.5)).mean() <= 0.01
+
+def test_importance_order_is_a_permutation(forest_and_data):
+    forest, X = forest_and_data
+    order = importance_order(forest, X[:200])
+    assert sorted(order) == list(range(len(forest.estimators_)))
+    EarlyExitForest(forest, order=order)
+    with pytest.raises(ValueError):
+        EarlyExitForest(forest, order=order[:-1])
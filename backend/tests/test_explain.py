@@ -0,0 +1,64 @@
+"""Contribuições de caminho: bias + soma(contribuições) reproduz o score"""
+import numpy as np
+import pytest
+from sklearn.datasets import make_classification
+from sklearn.ensemble import RandomForestClassifier
+
+from app.ml.explain import PathContributionExplainer
+
+@pytest.fixture(scope="module")
+def forest_and_data():
+    X, y = make_classification(
+        n_samples=2000, n_features=8, n_informative=5, weights=[0.9], random_state=0
+    )
+    forest = RandomForestClassifier(n_estimators=15, max_depth=8, random_state=0)
+    forest.fit(X[:1500], y[:1500])
+    return forest, X[1500:].astype(np.float32)
+
+def feature_names(n):
+    return [f"f{i}" for i in range(n)]
+
+def test_contributions_sum_to_score(forest_and_data):
+    forest, X = forest_and_data
+    explainer = PathContributionExplainer(forest, feature_names(X.shape[1]))
+    contributions, bias, trees_used = explainer.contributions(X)
+
+    assert trees_used == explainer.n_trees
+    expected = forest.predict_proba(X)[:, list(forest.classes_).index(1)]
+    np.testing.assert_allclose(bias + contributions.sum(axis=1), expected, atol=1e-10)
+
+def test_fraud_class_index():
+    X, y = make_classification(n_samples=500, n_features=4, random_state=0)
+    # Classes [1, 2]: a fraude (1) fica no índice 0
+    forest = RandomForestClassifier(n_estimators=5, max_depth=4, random_state=0).fit(X, y + 1)
+    explainer = PathContributionExplainer(forest, feature_names(4))
+    contributions, bias, _ = explainer.contributions(X)
+
+    expected = forest.predict_proba(X.astype(np.float32))[:, 0]
+    np.testing.assert_allclose(bias + contributions.sum(axis=1), expected, atol=1e-10)
+
+def test_time_cap_uses_partial_forest(forest_and_data):
+    forest, X = forest_and_data
+    explainer = PathContributionExplainer(forest, feature_names(X.shape[1]))
+    # Limite zero: para logo após a primeira árvore
+    contributions, bias, trees_used = explainer.contributions(X, time_cap_ms=0)
+
+    assert trees_used == 1
+    first_tree = forest.estimators_[0].predict_proba(X)[:, list(forest.classes_).index(1)]
+    np.testing.assert_allclose(bias + contributions.sum(axis=1), first_tree, atol=1e-10)
+
+    explanations = explainer.explain(X[:3], time_cap_ms=0)
+    assert all(not e['complete'] and e['trees_used'] == 1 for e in explanations)
+
+def test_explain_top_k(forest_and_data):
+    forest, X = forest_and_data
+    explainer = PathContributionExplainer(forest, feature_names(X.shape[1]))
+    explanations = explainer.explain(X[:4], top_k=3)
+
+    assert len(explanations) == 4
+    for explanation in explanations:
+        assert explanation['complete']
+        values = [abs(c['contribution']) for c in explanation['contributions']]
+        assert len(values) == 3
+        assert values == sorted(values, reverse=True)
+    assert len(explainer.explain(X[:1], top_k=100)[0]['contributions']) == X.shape[1]
@@ -0,0 +1,116 @@
+"""IdempotencyStore: uma computação por chave, sem guardar falhas"""
+import asyncio
+
+import pytest
+
+from app.core.idempotency import IdempotencyConflict, IdempotencyStore
+
+class Counter:
+    """Computação assíncrona que conta as execuções"""
+
+    def __init__(self, delay=0.0, fail_first=False):
+        self.calls = 0
+        self.delay = delay
+        self.fail_first = fail_first
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.fail_first and self.calls == 1:
+            raise RuntimeError("falha")
+        return f"resultado-{self.calls}"
+
+def test_concurrent_duplicates_run_once():
+    async def scenario():
+        store = IdempotencyStore()
+        compute = Counter(delay=0.05)
+        results = await asyncio.gather(*[store.run("k", "f", compute) for _ in range(5)])
+        return compute.calls, results
+
+    calls, results = asyncio.run(scenario())
+    assert calls == 1
+    assert [r for r, _ in results] == ["resultado-1"] * 5
+    assert sorted(replayed for _, replayed in results) == [False] + [True] * 4
+
+def test_completed_result_is_replayed():
+    async def scenario():
+        store = IdempotencyStore()
+        compute = Counter()
+        first = await store.run("k", "f", compute)
+        second = await store.run("k", "f", compute)
+        return compute.calls, first, second
+
+    calls, first, second = asyncio.run(scenario())
+    assert calls == 1
+    assert first == ("resultado-1", False)
+    assert second == ("resultado-1", True)
+
+def test_failures_are_not_cached():
+    async def scenario():
+        store = IdempotencyStore()
+        compute = Counter(fail_first=True)
+        with pytest.raises(RuntimeError):
+            await store.run("k", "f", compute)
+        result = await store.run("k", "f", compute)
+        return compute.calls, result
+
+    calls, result = asyncio.run(scenario())
+    assert calls == 2
+    assert result == ("resultado-2", False)
+
+def test_duplicate_recomputes_after_cancel():
+    async def scenario():
+        store = IdempotencyStore()
+        compute = Counter(delay=0.05)
+        original = asyncio.ensure_future(store.run("k", "f", compute))
+        await asyncio.sleep(0.01)
+        duplicate = asyncio.ensure_future(store.run("k", "f", compute))
+        await asyncio.sleep(0.01)
+        # Cliente original desconectou: o retry em espera refaz a computação
+        original.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await original
+        result = await duplicate
+        return compute.calls, result
+
+    calls, result = asyncio.run(scenario())
+    assert calls == 2
+    assert result == ("resultado-2", False)
+
+def test_uncacheable_result_is_recomputed():
+    async def scenario():
+        store = IdempotencyStore()
+        compute = Counter()
+
+        def cacheable(result):
+            return result != "resultado-1"
+
+        first = await store.run("k", "f", compute, cacheable)
+        second = await store.run("k", "f", compute, cacheable)
+        third = await store.run("k", "f", compute, cacheable)
+        return first, second, third
+
+    first, second, third = asyncio.run(scenario())
+    assert first == ("resultado-1", False)
+    assert second == ("resultado-2", False)
+    assert third == ("resultado-2", True)
+
+def test_key_reused_with_other_payload():
+    async def scenario():
+        store = IdempotencyStore()
+        await store.run("k", "f", Counter())
+        await store.run("k", "outro", Counter())
+
+    with pytest.raises(IdempotencyConflict):
+        asyncio.run(scenario())
+
+def test_lru_limit():
+    async def scenario():
+        store = IdempotencyStore(max_entries=2)
+        for key in ("a", "b", "c"):
+            await store.run(key, "f", Counter())
+        return len(store), (await store.run("a", "f", Counter()))[1]
+
+    size, replayed = asyncio.run(scenario())
+    assert size == 2
+    assert replayed is False
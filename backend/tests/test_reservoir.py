@@ -0,0 +1,71 @@
+"""Reservoir e amostragem estratificada: reprodutíveis com a mesma semente"""
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# sample_transactions.py fica na raiz do repositório (incluído no filtro de
+# caminhos do workflow, então mudanças nele também rodam estes testes)
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from sample_transactions import Reservoir, stratified_sample  # noqa: E402
+
+def fill(capacity, data, seed, chunk_size):
+    reservoir = Reservoir(capacity, data.shape[1], np.random.default_rng(seed))
+    for start in range(0, len(data), chunk_size):
+        reservoir.update(data[start:start + chunk_size])
+    return reservoir
+
+@pytest.fixture
+def data():
+    # Coluna 0 identifica a linha
+    values = np.random.default_rng(0).normal(size=(5000, 3))
+    values[:, 0] = np.arange(len(values))
+    return values
+
+def test_same_seed_same_sample(data):
+    first = fill(100, data, seed=7, chunk_size=512).sample()
+    second = fill(100, data, seed=7, chunk_size=512).sample()
+    np.testing.assert_array_equal(first, second)
+
+def test_different_seed_different_sample(data):
+    first = fill(100, data, seed=7, chunk_size=512).sample()
+    second = fill(100, data, seed=8, chunk_size=512).sample()
+    assert not np.array_equal(first, second)
+
+def test_sample_does_not_depend_on_chunk_size(data):
+    first = fill(100, data, seed=7, chunk_size=512).sample()
+    second = fill(100, data, seed=7, chunk_size=97).sample()
+    np.testing.assert_array_equal(first, second)
+
+def test_sample_rows_are_distinct_input_rows(data):
+    reservoir = fill(100, data, seed=7, chunk_size=512)
+    sample = reservoir.sample()
+    assert reservoir.seen == len(data)
+    assert sample.shape == (100, data.shape[1])
+    ids = sample[:, 0].astype(int)
+    assert len(np.unique(ids)) == 100
+    np.testing.assert_array_equal(sample, data[ids])
+
+def test_fewer_rows_than_capacity(data):
+    sample = fill(10000, data, seed=7, chunk_size=512).sample()
+    np.testing.assert_array_equal(sample, data)
+
+def test_stratified_sample_is_reproducible(tmp_path):
+    rng = np.random.default_rng(1)
+    df = pd.DataFrame(rng.normal(size=(3000, 3)), columns=['Time', 'V1', 'Amount'])
+    df['Class'] = (rng.random(3000) < 0.05).astype(int)
+    csv_path = tmp_path / "creditcard.csv"
+    df.to_csv(csv_path, index=False)
+
+    first = stratified_sample(str(csv_path), 500, fraud_ratio=0.1, seed=3, chunk_size=400)
+    second = stratified_sample(str(csv_path), 500, fraud_ratio=0.1, seed=3, chunk_size=400)
+
+    columns, X, y, seen = first
+    assert columns == ['Time', 'V1', 'Amount']
+    assert int(y.sum()) == 50
+    assert seen == {0: int((df['Class'] == 0).sum()), 1: int(df['Class'].sum())}
+    np.testing.assert_array_equal(X, second[1])
+    np.testing.assert_array_equal(y, second[2])
@@ -1,11 +1,15 @@
 import pandas as pd
+import numpy as np
 import json
 import os
 
+from sample_transactions import CHUNK_SIZE, Reservoir
+
 # Define os caminhos
 CSV_FILE_PATH = os.path.join('data', 'creditcard.csv')
 OUTPUT_JSON_PATH = os.path.join('dashboard-web', 'fraud_examples.json')
 NUM_EXAMPLES = 20 # Quantos exemplos de fraude queremos?
+SEED = 42 # Mesma semente = mesmos exemplos
 
 def extract_examples():
     print(f"Carregando dataset de {CSV_FILE_PATH}...")
@@ -17,19 +21,17 @@ def extract_examples():
         return
 
     try:
-        df = pd.read_csv(CSV_FILE_PATH)
-        
-        # Filtra apenas as fraudes (Classe 1)
-        frauds_df = df[df['Class'] == 1]
-        
-        # Pega 20 amostras aleatórias (ou menos, se não houver 20)
-        if len(frauds_df) > NUM_EXAMPLES:
-            samples_df = frauds_df.sample(NUM_EXAMPLES)
-        else:
-            samples_df = frauds_df
+        # Lê em blocos, mantendo só um reservatório com as fraudes (Classe 1)
+        reservoir = None
+        for chunk in pd.read_csv(CSV_FILE_PATH, chunksize=CHUNK_SIZE):
+            # Não precisamos da coluna 'Class' no JSON
+            columns = [c for c in chunk.columns if c != 'Class']
+            if reservoir is None:
+                reservoir = Reservoir(NUM_EXAMPLES, len(columns), np.random.default_rng(SEED))
+            reservoir.update(chunk.loc[chunk['Class'] == 1, columns].to_numpy(dtype=np.float64))
         
-        # Não precisamos da coluna 'Class' no JSON
-        samples_df = samples_df.drop(columns=['Class'])
+        # 20 amostras aleatórias (ou menos, se não houver 20)
+        samples_df = pd.DataFrame(reservoir.sample(), columns=columns)
         
         # Converte para uma lista de dicionários
         examples_list = samples_df.to_dict(orient='records')
@@ -264,7 +264,7 @@ resource "aws_lb_target_group" "backend" {
     unhealthy_threshold = 3
     timeout             = 5
     interval            = 30
-    path                = "/health"
+    path                = "/ready" # Só recebe tráfego após o aquecimento do modelo
     protocol            = "HTTP"
     matcher             = "200"
   }
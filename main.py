@@ -1,12 +1,21 @@
 import pandas as pd
 import joblib
 import json
+import math
 import numpy as np
-from fastapi import FastAPI
+import os
+import sys
+import threading
+import time
+from fastapi import FastAPI, Header, HTTPException, Query, Request
 from pydantic import BaseModel
-from typing import List
+from typing import List, Optional
 from fastapi.middleware.cors import CORSMiddleware  # <-- 1. IMPORTAÇÃO NOVA
 
+# Explicador compartilhado com o backend (backend/app/ml/explain.py)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+from app.ml.explain import PathContributionExplainer
+
 # 1. Inicializa o aplicativo FastAPI
 app = FastAPI(
     title="API de Detecção de Fraude",
@@ -27,6 +36,78 @@ app.add_middleware(
 )
 # ==================================================================
 
+# Prazo por requisição: o orçamento do header X-Deadline-Ms conta a partir
+# da chegada da requisição (inclui o tempo de espera por uma thread livre)
+REDUCED_TREES = 10  # Máximo de árvores quando o orçamento não comporta a floresta inteira
+LATENCY_PROBE_SECONDS = 5.0  # Intervalo máximo sem medir a floresta inteira
+deadline_stats = {
+    "requests_with_deadline": 0,
+    "expired_before_inference": 0,
+    "degraded_reduced_forest": 0,
+    "degraded_heuristic": 0,
+    "deadline_missed": 0,
+    "latency_probes": 0,
+}
+inference_latency_ms = None  # Média móvel da inferência completa
+last_full_inference = 0.0  # time.monotonic() da última medição completa
+# /predict é síncrono e roda no threadpool: a estimativa é compartilhada
+latency_lock = threading.Lock()
+
+def observe_latency(elapsed_ms, full=False):
+    global inference_latency_ms, last_full_inference
+    with latency_lock:
+        inference_latency_ms = elapsed_ms if inference_latency_ms is None else (
+            0.9 * inference_latency_ms + 0.1 * elapsed_ms
+        )
+        if full:
+            last_full_inference = time.monotonic()
+
+def should_degrade(remaining_ms):
+    """
+    True se o orçamento não comporta a latência estimada. Se a floresta
+    inteira não roda há LATENCY_PROBE_SECONDS, esta requisição a executa
+    para re-medir (uma amostra lenta não trava a degradação para sempre).
+    """
+    global last_full_inference
+    with latency_lock:
+        if remaining_ms is None or inference_latency_ms is None or remaining_ms >= inference_latency_ms:
+            return False
+        now = time.monotonic()
+        if now - last_full_inference < LATENCY_PROBE_SECONDS:
+            return True
+        last_full_inference = now
+        deadline_stats["latency_probes"] += 1
+        return False
+
+def heuristic_score(transaction):
+    """Score barato (mesma heurística do backend) quando não há tempo nem para poucas árvores"""
+    hour = (transaction.Time // 3600) % 24
+    fraud_score = 0.0
+    if transaction.Amount > 5000:
+        fraud_score += 0.3
+    if hour < 6 or hour > 22:
+        fraud_score += 0.2
+    if transaction.Amount > 10000:
+        fraud_score += 0.3
+    return min(fraud_score, 0.95)
+
+def heuristic_response(transaction):
+    deadline_stats["degraded_heuristic"] += 1
+    probability_fraud = heuristic_score(transaction)
+    result = int(probability_fraud > 0.5)
+    return {
+        "prediction": result,
+        "prediction_label": "Fraude" if result == 1 else "Legítimo",
+        "probability_fraud": probability_fraud,
+        "degraded": True,
+        "decided_by": "heuristic"
+    }
+
+@app.middleware("http")
+async def stamp_arrival(request: Request, call_next):
+    request.state.received_at = time.monotonic()
+    return await call_next(request)
+
 
 # 3. Carrega os artefatos salvos (modelo, scaler, colunas)
 try:
@@ -44,6 +125,18 @@ except FileNotFoundError as e:
     feature_columns = []
 
 
+# 3.1. Explicações (explain=true): mesma implementação do backend, com
+# tabelas de contribuição pré-calculadas por folha e limite de tempo
+EXPLAIN_TIME_CAP_MS = 20.0  # Limite por requisição (nunca além do prazo)
+DEADLINE_SAFETY_MARGIN_MS = 2.0
+
+try:
+    explainer = PathContributionExplainer(model, feature_columns) if model is not None else None
+except Exception as e:
+    print(f"Explicações indisponíveis: {e}")
+    explainer = None
+
+
 # 4. Define a estrutura de dados de entrada (Request Body)
 class Transaction(BaseModel):
     Time: float
@@ -92,14 +185,37 @@ class Transaction(BaseModel):
 
 # 5. Define o endpoint de predição
 @app.post("/predict")
-def predict_fraud(transaction: Transaction):
+def predict_fraud(
+    transaction: Transaction,
+    request: Request,
+    x_deadline_ms: Optional[float] = Header(None, alias="X-Deadline-Ms"),
+    explain: bool = Query(False),
+    top_k: int = Query(5, ge=1, le=33)
+):
     """
     Recebe os dados de uma transação e retorna a predição de fraude.
     - **Retorno:** `{"prediction": 0}` (Legítimo) ou `{"prediction": 1}` (Fraude).
+    - **X-Deadline-Ms (opcional):** orçamento em ms. Se não couber a floresta
+      inteira, usa as árvores que cabem no orçamento (até REDUCED_TREES) ou a
+      heurística, e retorna `"degraded": true`.
+    - **explain=true (opcional):** inclui as `top_k` features que mais
+      contribuíram para a probabilidade de fraude.
     """
     if not model or not scaler or not feature_columns:
         return {"error": "Modelo não carregado. Verifique os logs do servidor."}
 
+    expires_at = None
+    if x_deadline_ms is not None:
+        if not math.isfinite(x_deadline_ms) or x_deadline_ms <= 0:
+            raise HTTPException(status_code=400, detail="X-Deadline-Ms deve ser um número finito maior que zero")
+        deadline_stats["requests_with_deadline"] += 1
+        expires_at = request.state.received_at + x_deadline_ms / 1000.0
+        # Prazo expirado na fila: responder com a heurística, sem inferência
+        if time.monotonic() >= expires_at:
+            deadline_stats["expired_before_inference"] += 1
+            deadline_stats["deadline_missed"] += 1
+            return heuristic_response(transaction)
+
     # 5.1. Converte os dados de entrada Pydantic para um DataFrame do Pandas
     input_data = pd.DataFrame([transaction.dict()])
 
@@ -143,17 +259,61 @@ def predict_fraud(transaction: Transaction):
                         except:
                             pass
         
-        prediction = model.predict(final_input_data)
-        prediction_proba = model.predict_proba(final_input_data) 
-        
-        result = int(prediction[0])
-        probability_fraud = float(prediction_proba[0][1]) # Probabilidade de ser classe 1 (Fraude)
+        remaining_ms = None if expires_at is None else (expires_at - time.monotonic()) * 1000.0
+        degraded = hasattr(model, 'estimators_') and should_degrade(remaining_ms)
+        decided_by = "forest"
+
+        if degraded:
+            # Subconjunto de árvores que cabe no orçamento (custo proporcional ao número de árvores)
+            estimators = model.estimators_
+            fraud_index = list(model.classes_).index(1)
+            per_tree_ms = inference_latency_ms / len(estimators)
+            n_trees = min(REDUCED_TREES, int(max(remaining_ms, 0.0) // per_tree_ms))
+            if n_trees < 1:
+                return heuristic_response(transaction)
 
-        return {
+            deadline_stats["degraded_reduced_forest"] += 1
+            decided_by = "reduced_forest"
+            X = final_input_data.to_numpy(dtype=np.float32)
+            start = time.perf_counter()
+            probability_fraud = float(np.mean([
+                estimator.predict_proba(X)[0][fraud_index] for estimator in estimators[:n_trees]
+            ]))
+            # Tempo escalado para a floresta inteira também atualiza a estimativa
+            observe_latency((time.perf_counter() - start) * 1000.0 * len(estimators) / n_trees)
+            result = int(probability_fraud > 0.5)
+        else:
+            start = time.perf_counter()
+            prediction = model.predict(final_input_data)
+            prediction_proba = model.predict_proba(final_input_data) 
+            observe_latency((time.perf_counter() - start) * 1000.0, full=True)
+            
+            result = int(prediction[0])
+            probability_fraud = float(prediction_proba[0][1]) # Probabilidade de ser classe 1 (Fraude)
+
+        if expires_at is not None and time.monotonic() > expires_at:
+            deadline_stats["deadline_missed"] += 1
+
+        response = {
             "prediction": result,
             "prediction_label": "Fraude" if result == 1 else "Legítimo",
-            "probability_fraud": probability_fraud
+            "probability_fraud": probability_fraud,
+            "degraded": degraded,
+            "decided_by": decided_by
         }
+
+        # Explicação: não gasta tempo extra em respostas já degradadas pelo prazo
+        if explain and explainer is not None and not degraded:
+            time_cap_ms = EXPLAIN_TIME_CAP_MS
+            if expires_at is not None:
+                time_cap_ms = min(time_cap_ms, (expires_at - time.monotonic()) * 1000.0 - DEADLINE_SAFETY_MARGIN_MS)
+            # Sem orçamento para explicar: responde só com a predição
+            if time_cap_ms > 0:
+                response["explanation"] = explainer.explain(
+                    final_input_data.to_numpy(dtype=np.float32), top_k, time_cap_ms
+                )[0]
+
+        return response
     except AttributeError as e:
         # Erro específico de incompatibilidade de versão
         error_msg = str(e)
@@ -165,6 +325,11 @@ def predict_fraud(transaction: Transaction):
     except Exception as e:
         return {"error": f"Erro na predição: {str(e)}"}
 
+# Contadores de prazos perdidos e degradações
+@app.get("/metrics")
+def metrics():
+    return {"deadlines": deadline_stats, "inference_latency_ms": inference_latency_ms}
+
 # Ponto de "boas-vindas" para testar se a API está no ar
 @app.get("/")
 def read_root():
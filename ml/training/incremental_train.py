@@ -0,0 +1,233 @@
+"""
+Treinamento Incremental do Modelo de Classificação de Fraude
+
+Atualiza o modelo atual com um novo lote rotulado, sem refazer o treino
+completo:
+
+1. Carrega models/fraud_classifier.pkl e os artefatos de pré-processamento
+   já ajustados (scalers/amount_scaler.pkl, models/feature_columns.json)
+2. Separa parte do lote para o holdout móvel (data/holdout.npz), que mantém
+   as linhas mais recentes até um tamanho máximo
+3. Treina novas árvores só com o restante do lote (warm_start) e as adiciona
+   à floresta (`add`) ou substitui as mais antigas (`replace`)
+4. Compara o modelo anterior e o novo no holdout móvel e salva uma nova
+   versão em models/versions/; só então o holdout móvel é gravado, para que
+   uma falha no treino não altere o holdout
+
+Uso (a partir de ml/, como train_model.py):
+
+    python training/incremental_train.py --batch data/new_labeled.csv --trees 20 --mode replace
+
+Com --promote, a nova versão substitui models/fraud_classifier.pkl se o
+recall no holdout não cair mais que --max-recall-drop.
+"""
+import argparse
+import copy
+import json
+import logging
+import time
+from datetime import datetime
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+from imblearn.over_sampling import SMOTE
+from sklearn.model_selection import train_test_split
+
+from train_model import build_features, evaluate_model, load_data
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+MODES = ('add', 'replace')
+
+# Artefatos derivados da floresta que ficam desatualizados com um novo modelo
+DERIVED_ARTIFACTS = (
+    'compact_forest.npz',
+    'tree_order.json',
+    'drift_baseline.json',
+    'prefilter.pkl',
+    'cascade_config.json',
+)
+
+def load_artifacts(base_path='models', scalers_path='scalers'):
+    """Carrega o modelo atual e os artefatos de pré-processamento em cache"""
+    model = joblib.load(Path(base_path) / 'fraud_classifier.pkl')
+    scaler = joblib.load(Path(scalers_path) / 'amount_scaler.pkl')
+    with open(Path(base_path) / 'feature_columns.json', 'r') as f:
+        feature_columns = json.load(f)
+    logger.info(f"Modelo atual: {len(model.estimators_)} árvores")
+    return model, scaler, feature_columns
+
+def balance_batch(X, y, k_neighbors=5):
+    """SMOTE no lote, como no treino completo, quando há fraudes suficientes"""
+    frauds = int(np.sum(y == 1))
+    if frauds <= k_neighbors or frauds / max(len(y) - frauds, 1) >= 0.1:
+        logger.info(f"Lote com {frauds} fraudes: sem SMOTE")
+        return X, y
+    smote = SMOTE(random_state=42, sampling_strategy=0.1, k_neighbors=k_neighbors)
+    return smote.fit_resample(X, y)
+
+def update_forest(model, X_new, y_new, n_trees, mode='add'):
+    """
+    Treina `n_trees` árvores novas só com o lote (warm_start) e devolve uma
+    cópia da floresta. Em `replace`, as `n_trees` árvores mais antigas saem,
+    mantendo o tamanho do modelo.
+    """
+    if mode not in MODES:
+        raise ValueError(f"Modo inválido: {mode}")
+    if len(np.unique(y_new)) < 2:
+        raise ValueError("O lote de treino precisa ter as duas classes")
+
+    updated = copy.deepcopy(model)
+    n_old = len(updated.estimators_)
+    updated.set_params(warm_start=True, n_estimators=n_old + n_trees)
+    # warm_start mantém as árvores existentes e ajusta apenas as novas
+    updated.fit(X_new, y_new)
+    updated.set_params(warm_start=False)
+
+    if mode == 'replace':
+        updated.estimators_ = updated.estimators_[n_trees:]
+        updated.n_estimators = len(updated.estimators_)
+
+    logger.info(f"Floresta atualizada ({mode}): {n_old} -> {len(updated.estimators_)} árvores")
+    return updated
+
+def merge_holdout(X_new, y_new, max_size, path='data/holdout.npz'):
+    """Holdout atual com as linhas novas no fim, sem as mais antigas (não grava)"""
+    X_new = np.asarray(X_new, dtype=np.float64)
+    y_new = np.asarray(y_new, dtype=np.int64)
+    if Path(path).exists():
+        holdout = np.load(path)
+        X_new = np.concatenate([holdout['X'], X_new])
+        y_new = np.concatenate([holdout['y'], y_new])
+    return X_new[-max_size:], y_new[-max_size:]
+
+def save_holdout(X_holdout, y_holdout, path='data/holdout.npz'):
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    np.savez_compressed(path, X=X_holdout, y=y_holdout)
+    logger.info(f"Holdout móvel: {len(y_holdout)} linhas ({int(y_holdout.sum())} fraudes)")
+
+def next_version(base_path='models'):
+    """Próximo número de versão, a partir das versões já salvas"""
+    versions = [
+        int(p.stem.rsplit('_v', 1)[1])
+        for p in (Path(base_path) / 'versions').glob('fraud_classifier_v*.pkl')
+    ]
+    return max(versions, default=0) + 1
+
+def current_version(base_path='models'):
+    path = Path(base_path) / 'model_version.json'
+    if not path.exists():
+        return None
+    with open(path, 'r') as f:
+        return json.load(f).get('version')
+
+def save_version(model, metadata, base_path='models'):
+    """Salva o modelo e os metadados como uma nova versão"""
+    versions_path = Path(base_path) / 'versions'
+    versions_path.mkdir(parents=True, exist_ok=True)
+
+    version = metadata['version']
+    model_path = versions_path / f'fraud_classifier_v{version}.pkl'
+    joblib.dump(model, model_path)
+    with open(versions_path / f'fraud_classifier_v{version}.json', 'w') as f:
+        json.dump(metadata, f, indent=2)
+    logger.info(f"Versão {version} salva: {model_path}")
+    return model_path
+
+def promote(model, version, base_path='models'):
+    """Substitui o modelo servido pela nova versão"""
+    joblib.dump(model, Path(base_path) / 'fraud_classifier.pkl')
+    with open(Path(base_path) / 'model_version.json', 'w') as f:
+        json.dump({'version': version}, f, indent=2)
+    logger.info(f"Versão {version} promovida para {Path(base_path) / 'fraud_classifier.pkl'}")
+
+    stale = [name for name in DERIVED_ARTIFACTS if (Path(base_path) / name).exists()]
+    if stale:
+        logger.warning(
+            f"Artefatos derivados da floresta anterior: {', '.join(stale)}. "
+            "Gere-os novamente (app.ml.compact_forest / app.ml.early_exit; "
+            "baseline de drift e cascata com train_model.py)."
+        )
+
+def main():
+    parser = argparse.ArgumentParser(description="Treinamento incremental com um novo lote rotulado")
+    parser.add_argument('--batch', required=True, help="CSV no formato do dataset (Time, V1..V28, Amount, Class)")
+    parser.add_argument('--trees', type=int, default=20, help="Árvores novas treinadas com o lote")
+    parser.add_argument('--mode', choices=MODES, default='replace')
+    parser.add_argument('--holdout-fraction', type=float, default=0.2,
+                        help="Fração do lote que entra no holdout móvel")
+    parser.add_argument('--holdout-size', type=int, default=50000, help="Tamanho máximo do holdout móvel")
+    parser.add_argument('--promote', action='store_true', help="Substituir models/fraud_classifier.pkl")
+    parser.add_argument('--max-recall-drop', type=float, default=0.01)
+    args = parser.parse_args()
+
+    logger.info("=" * 50)
+    logger.info("Iniciando treinamento incremental")
+    logger.info("=" * 50)
+    start = time.perf_counter()
+
+    # 1. Modelo atual e pré-processamento em cache
+    model, scaler, feature_columns = load_artifacts()
+
+    # 2. Novo lote, com o scaler já ajustado (sem reajustar)
+    X_batch, y_batch = build_features(load_data(args.batch), scaler, feature_columns)
+    X_batch, y_batch = X_batch.to_numpy(dtype=np.float64), y_batch.to_numpy()
+    logger.info(f"Lote: {len(y_batch)} transações ({int(y_batch.sum())} fraudes)")
+
+    # 3. Parte do lote entra no holdout móvel; o restante treina as árvores novas
+    X_train, X_recent, y_train, y_recent = train_test_split(
+        X_batch, y_batch,
+        test_size=args.holdout_fraction,
+        random_state=42,
+        stratify=y_batch if np.bincount(y_batch).min() >= 2 else None
+    )
+    X_holdout, y_holdout = merge_holdout(X_recent, y_recent, args.holdout_size)
+
+    # 4. Novas árvores (com os nomes de features usados no treino completo)
+    X_train = pd.DataFrame(X_train, columns=feature_columns)
+    X_train, y_train = balance_batch(X_train, y_train)
+    updated = update_forest(model, X_train, y_train, args.trees, args.mode)
+
+    # 5. Avaliar anterior x novo no holdout móvel
+    logger.info("Modelo anterior:")
+    before = evaluate_model(model, X_holdout, y_holdout)
+    logger.info("Modelo atualizado:")
+    after = evaluate_model(updated, X_holdout, y_holdout)
+
+    # 6. Salvar nova versão e, depois dela, o holdout móvel
+    version = next_version()
+    save_version(updated, {
+        'version': version,
+        'parent_version': current_version(),
+        'created_at': datetime.utcnow().isoformat() + "Z",
+        'mode': args.mode,
+        'new_trees': args.trees,
+        'n_estimators': len(updated.estimators_),
+        'batch': args.batch,
+        'batch_size': int(len(y_batch)),
+        'batch_frauds': int(y_batch.sum()),
+        'holdout_size': int(len(y_holdout)),
+        'metrics_before': {k: float(v) for k, v in before.items()},
+        'metrics_after': {k: float(v) for k, v in after.items()},
+        'training_seconds': time.perf_counter() - start,
+    })
+    save_holdout(X_holdout, y_holdout)
+
+    if args.promote:
+        if after['recall'] >= before['recall'] - args.max_recall_drop:
+            promote(updated, version)
+        else:
+            logger.warning(
+                f"Versão {version} não promovida: recall {after['recall']:.4f} "
+                f"< {before['recall']:.4f} - {args.max_recall_drop}"
+            )
+
+    logger.info("=" * 50)
+    logger.info(f"Treinamento incremental concluído em {time.perf_counter() - start:.1f}s")
+    logger.info("=" * 50)
+
+if __name__ == "__main__":
+    main()
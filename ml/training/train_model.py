@@ -4,7 +4,8 @@ Script de Treinamento do Modelo de Classificação de Fraude
 import pandas as pd
 import numpy as np
 from sklearn.ensemble import RandomForestClassifier
-from sklearn.model_selection import train_test_split
+from sklearn.linear_model import LogisticRegression
+from sklearn.model_selection import StratifiedKFold, train_test_split
 from sklearn.metrics import (
     accuracy_score, precision_score, recall_score, f1_score,
     roc_auc_score, confusion_matrix, classification_report
@@ -27,10 +28,38 @@ def load_data(filepath: str = 'data/creditcard.csv'):
     logger.info(f"Dataset carregado: {df.shape[0]} transações, {df.shape[1]} features")
     return df
 
+FEATURE_COLUMNS = [
+    'V1', 'V2', 'V3', 'V4', 'V5', 'V6', 'V7', 'V8', 'V9', 'V10',
+    'V11', 'V12', 'V13', 'V14', 'V15', 'V16', 'V17', 'V18', 'V19', 'V20',
+    'V21', 'V22', 'V23', 'V24', 'V25', 'V26', 'V27', 'V28',
+    'Amount_scaled',
+    'hour_sin', 'hour_cos', 'day_sin', 'day_cos'
+]
+
+# Transações reais (sem SMOTE) reservadas fora de todo treino: holdout das
+# validações offline e referência do score no baseline de drift. Fração
+# pequena para não encolher o treino do modelo servido (76% das linhas,
+# contra 80% sem a reserva)
+REAL_HOLDOUT_FRACTION = 0.05
+
 def preprocess_data(df: pd.DataFrame):
     """Pré-processa dados e cria features"""
     logger.info("Pré-processando dados...")
     
+    # Normalizar Amount usando RobustScaler
+    scaler = RobustScaler()
+    scaler.fit(df[['Amount']])
+    
+    X, y = build_features(df, scaler)
+    
+    logger.info(f"Distribuição de classes: {y.value_counts().to_dict()}")
+    
+    return X, y, scaler, list(FEATURE_COLUMNS)
+
+def build_features(df: pd.DataFrame, scaler, feature_columns=FEATURE_COLUMNS):
+    """Cria as features do modelo com um scaler já ajustado (também usado no treino incremental)"""
+    df = df.copy()
+    
     # Converter Time em features temporais
     df['hour'] = (df['Time'] // 3600) % 24
     df['day_of_week'] = (df['Time'] // (3600 * 24)) % 7
@@ -41,25 +70,13 @@ def preprocess_data(df: pd.DataFrame):
     df['day_sin'] = np.sin(2 * np.pi * df['day_of_week'] / 7)
     df['day_cos'] = np.cos(2 * np.pi * df['day_of_week'] / 7)
     
-    # Normalizar Amount usando RobustScaler
-    scaler = RobustScaler()
-    df['Amount_scaled'] = scaler.fit_transform(df[['Amount']])
+    df['Amount_scaled'] = scaler.transform(df[['Amount']])
     
     # Selecionar features
-    feature_columns = [
-        'V1', 'V2', 'V3', 'V4', 'V5', 'V6', 'V7', 'V8', 'V9', 'V10',
-        'V11', 'V12', 'V13', 'V14', 'V15', 'V16', 'V17', 'V18', 'V19', 'V20',
-        'V21', 'V22', 'V23', 'V24', 'V25', 'V26', 'V27', 'V28',
-        'Amount_scaled',
-        'hour_sin', 'hour_cos', 'day_sin', 'day_cos'
-    ]
-    
-    X = df[feature_columns]
+    X = df[list(feature_columns)]
     y = df['Class']
     
-    logger.info(f"Distribuição de classes: {y.value_counts().to_dict()}")
-    
-    return X, y, scaler, feature_columns
+    return X, y
 
 def balance_classes(X, y):
     """Balanceia classes usando SMOTE"""
@@ -92,6 +109,130 @@ def train_model(X_train, y_train):
     
     return model
 
+def train_prefilter(X_train, y_train):
+    """Treina o pré-filtro barato (primeiro estágio da cascata)"""
+    logger.info("Treinando pré-filtro (Regressão Logística)...")
+    
+    prefilter = LogisticRegression(
+        class_weight='balanced',
+        max_iter=1000,
+        random_state=42
+    )
+    prefilter.fit(X_train, y_train)
+    logger.info("Pré-filtro treinado com sucesso")
+    
+    return prefilter
+
+def cross_fit_prefilter_scores(X, y, n_splits=5):
+    """
+    Score do pré-filtro em cada transação real, dado por um pré-filtro
+    treinado (com SMOTE, como o final) nas demais partições. Calibra a
+    cascata com todas as fraudes reais do treino, sem reservar dados.
+    """
+    logger.info(f"Scores do pré-filtro fora da partição ({n_splits} partições)...")
+    
+    X, y = pd.DataFrame(X), pd.Series(np.asarray(y))
+    scores = np.zeros(len(y))
+    folds = StratifiedKFold(n_splits=n_splits, shuffle=True, random_state=42)
+    for fit_index, score_index in folds.split(X, y):
+        X_fit, y_fit = balance_classes(X.iloc[fit_index], y.iloc[fit_index])
+        prefilter = train_prefilter(X_fit, y_fit)
+        scores[score_index] = prefilter.predict_proba(X.iloc[score_index])[:, 1]
+    
+    return scores
+
+def calibrate_cascade(scores, y_cal, target_recall=0.995,
+                      target_precision=0.99, min_support=20):
+    """
+    Calibra os limiares da cascata a partir dos scores do pré-filtro em
+    transações que ele não viu no treino.
+    
+    - low_threshold: maior limiar que ainda envia à floresta pelo menos
+      `target_recall` das fraudes (abaixo dele, o pré-filtro decide legítimo)
+    - high_threshold: menor limiar acima do qual o pré-filtro tem precisão
+      >= `target_precision` com pelo menos `min_support` transações
+      (acima dele, o pré-filtro decide fraude); None se não houver
+    """
+    logger.info(f"Calibrando cascata para recall alvo de {target_recall:.3f}...")
+    
+    scores = np.asarray(scores)
+    y_cal = np.asarray(y_cal)
+    
+    fraud_scores = np.sort(scores[y_cal == 1])
+    k = int(np.floor((1 - target_recall) * len(fraud_scores)))
+    low_threshold = float(fraud_scores[k])
+    
+    order = np.argsort(-scores)
+    sorted_scores = scores[order]
+    precision = np.cumsum(y_cal[order] == 1) / np.arange(1, len(order) + 1)
+    high_threshold = None
+    for i in range(min_support - 1, len(order)):
+        if precision[i] < target_precision:
+            break
+        # Só corta na fronteira entre scores distintos
+        if i + 1 == len(order) or sorted_scores[i + 1] < sorted_scores[i]:
+            high_threshold = float(sorted_scores[i])
+    if high_threshold is not None and high_threshold <= low_threshold:
+        high_threshold = None
+    
+    to_forest = scores >= low_threshold
+    if high_threshold is not None:
+        to_forest &= scores < high_threshold
+    
+    cascade_config = {
+        'low_threshold': low_threshold,
+        'high_threshold': high_threshold,
+        'target_recall': target_recall,
+        'target_precision': target_precision,
+        'calibration_recall': float((scores[y_cal == 1] >= low_threshold).mean()),
+        'calibration_forest_fraction': float(to_forest.mean()),
+        'calibration_samples': int(len(y_cal))
+    }
+    
+    logger.info(f"Limiares: low={low_threshold:.4f}, high={high_threshold}")
+    logger.info(f"Fração enviada à floresta (calibração): {cascade_config['calibration_forest_fraction']:.2%}")
+    
+    return cascade_config
+
+def build_drift_baseline(model, X, X_unseen, feature_columns, n_bins=20, max_samples=100000):
+    """
+    Baseline do monitor de drift: limites de bins fixos e contagens de
+    referência por feature (quantis, sobre a distribuição original sem
+    SMOTE) e para o fraud_score (bins uniformes). O score é calculado só em
+    `X_unseen`, linhas reais fora do treino: scores de linhas de treino são
+    mais extremos que os de produção.
+    """
+    logger.info("Calculando baseline de drift...")
+    
+    rng = np.random.default_rng(42)
+    X = np.asarray(X, dtype=np.float64)
+    if len(X) > max_samples:
+        X = X[rng.choice(len(X), max_samples, replace=False)]
+    X_unseen = np.asarray(X_unseen, dtype=np.float64)
+    if len(X_unseen) > max_samples:
+        X_unseen = X_unseen[rng.choice(len(X_unseen), max_samples, replace=False)]
+    scores = model.predict_proba(X_unseen)[:, 1]
+    
+    def histogram(name, values, edges):
+        # Bin = número de limites estritamente menores que o valor (igual ao monitor)
+        bins = np.searchsorted(edges, values, side='left')
+        counts = np.bincount(bins, minlength=len(edges) + 1)
+        return {'name': name, 'edges': edges.tolist(), 'counts': counts.tolist()}
+    
+    quantiles = np.linspace(0, 1, n_bins + 1)[1:-1]
+    features = [
+        histogram(name, X[:, i], np.unique(np.quantile(X[:, i], quantiles)))
+        for i, name in enumerate(feature_columns)
+    ]
+    score = histogram('fraud_score', scores, quantiles)
+    
+    return {
+        'features': features,
+        'fraud_score': score,
+        'samples': int(len(X)),
+        'score_samples': int(len(X_unseen))
+    }
+
 def evaluate_model(model, X_test, y_test):
     """Avalia o modelo"""
     logger.info("Avaliando modelo...")
@@ -149,6 +290,38 @@ def save_model(model, scaler, feature_columns, base_path='models'):
         json.dump(feature_columns, f, indent=2)
     logger.info(f"Features salvas: {features_path}")
 
+def save_cascade(prefilter, cascade_config, base_path='models'):
+    """Salva o pré-filtro e os limiares calibrados da cascata"""
+    prefilter_path = Path(base_path) / 'prefilter.pkl'
+    joblib.dump(prefilter, prefilter_path)
+    logger.info(f"Pré-filtro salvo: {prefilter_path}")
+    
+    config_path = Path(base_path) / 'cascade_config.json'
+    with open(config_path, 'w') as f:
+        json.dump(cascade_config, f, indent=2)
+    logger.info(f"Configuração da cascata salva: {config_path}")
+
+def save_drift_baseline(drift_baseline, base_path='models'):
+    """Salva o baseline usado pelo monitor de drift da API"""
+    baseline_path = Path(base_path) / 'drift_baseline.json'
+    with open(baseline_path, 'w') as f:
+        json.dump(drift_baseline, f)
+    logger.info(f"Baseline de drift salvo: {baseline_path}")
+
+def save_holdout(X_holdout, y_holdout, base_path='data'):
+    """
+    Salva transações reais (sem SMOTE) que não entraram no treino nem na
+    calibração, para validações offline (ex: parada antecipada, cascata)
+    """
+    Path(base_path).mkdir(parents=True, exist_ok=True)
+    holdout_path = Path(base_path) / 'holdout.npz'
+    np.savez_compressed(
+        holdout_path,
+        X=np.asarray(X_holdout, dtype=np.float64),
+        y=np.asarray(y_holdout, dtype=np.int64)
+    )
+    logger.info(f"Holdout salvo: {holdout_path}")
+
 def main():
     """Pipeline principal de treinamento"""
     logger.info("=" * 50)
@@ -162,10 +335,18 @@ def main():
         # 2. Pré-processar
         X, y, scaler, feature_columns = preprocess_data(df)
         
-        # 3. Balancear classes
-        X_balanced, y_balanced = balance_classes(X, y)
+        # 3. Reservar transações reais (sem SMOTE) que nenhum modelo vê
+        X_model, X_holdout, y_model, y_holdout = train_test_split(
+            X, y,
+            test_size=REAL_HOLDOUT_FRACTION,
+            random_state=42,
+            stratify=y
+        )
+        
+        # 4. Balancear classes
+        X_balanced, y_balanced = balance_classes(X_model, y_model)
         
-        # 4. Split train/test
+        # 5. Split train/test
         X_train, X_test, y_train, y_test = train_test_split(
             X_balanced, y_balanced,
             test_size=0.2,
@@ -173,14 +354,26 @@ def main():
             stratify=y_balanced
         )
         
-        # 5. Treinar modelo
+        # 6. Treinar modelo
         model = train_model(X_train, y_train)
         
-        # 6. Avaliar
+        # 7. Avaliar
         metrics = evaluate_model(model, X_test, y_test)
         
-        # 7. Salvar
+        # 8. Cascata: pré-filtro treinado no treino e calibrado em transações
+        #    reais (proporção de fraude de produção, sem fraudes sintéticas),
+        #    com scores fora da partição
+        prefilter = train_prefilter(X_train, y_train)
+        cascade_config = calibrate_cascade(cross_fit_prefilter_scores(X_model, y_model), y_model)
+        
+        # 9. Baseline de drift (distribuição real; score só em linhas fora do treino)
+        drift_baseline = build_drift_baseline(model, X, X_holdout, feature_columns)
+        
+        # 10. Salvar
         save_model(model, scaler, feature_columns)
+        save_cascade(prefilter, cascade_config)
+        save_drift_baseline(drift_baseline)
+        save_holdout(X_holdout, y_holdout)
         
         logger.info("=" * 50)
         logger.info("Treinamento concluído com sucesso!")
@@ -1,4 +1,4 @@
-import React, { useState } from 'react';
+import React, { useRef, useState } from 'react';
 import {
   View,
   Text,
@@ -12,7 +12,12 @@ import {
   Platform,
 } from 'react-native';
 import { useNavigation } from '@react-navigation/native';
-import { apiService, ClassificationRequest } from '../services/api';
+import {
+  apiService,
+  ClassificationRequest,
+  generateIdempotencyKey,
+  IdempotencyConflictError,
+} from '../services/api';
 
 const MERCHANT_CATEGORIES = [
   { label: 'Online Retail', value: 'online_retail' },
@@ -40,6 +45,9 @@ export default function TransactionSimulationScreen() {
   const [locationIndex, setLocationIndex] = useState(0);
   const [isLoading, setIsLoading] = useState(false);
   const [errors, setErrors] = useState<Record<string, string>>({});
+  // Chave da transação ainda sem resultado: reenviar os mesmos dados após
+  // uma falha reutiliza a chave, e o backend não classifica duas vezes
+  const pendingTransaction = useRef<{ key: string; payload: string } | null>(null);
 
   const validate = (): boolean => {
     const newErrors: Record<string, string> = {};
@@ -93,7 +101,15 @@ export default function TransactionSimulationScreen() {
         previous_transactions_count: 15,
       };
 
-      const result = await apiService.classifyTransaction(requestData);
+      const payload = JSON.stringify(requestData);
+      let pending = pendingTransaction.current;
+      if (!pending || pending.payload !== payload) {
+        pending = { key: generateIdempotencyKey(), payload };
+        pendingTransaction.current = pending;
+      }
+
+      const result = await apiService.classifyTransaction(requestData, pending.key);
+      pendingTransaction.current = null;
 
       // Navegar para tela de resultado
       navigation.navigate('TransactionResult', {
@@ -105,6 +121,9 @@ export default function TransactionSimulationScreen() {
         },
       });
     } catch (error: any) {
+      if (error instanceof IdempotencyConflictError) {
+        pendingTransaction.current = null;
+      }
       Alert.alert('Erro', error.message || 'Falha ao classificar transação');
     } finally {
       setIsLoading(false);
@@ -118,6 +137,7 @@ export default function TransactionSimulationScreen() {
     setDayOfWeek(new Date().getDay().toString());
     setLocationIndex(0);
     setErrors({});
+    pendingTransaction.current = null;
   };
 
   return (
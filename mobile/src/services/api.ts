@@ -22,6 +22,7 @@ export interface ClassificationRequest {
   };
   user_id?: string;
   previous_transactions_count?: number;
+  client_transaction_id?: string;
 }
 
 export interface ClassificationResponse {
@@ -37,6 +38,20 @@ export interface ClassificationResponse {
   timestamp: string;
 }
 
+// Chave única por transação: retries reaproveitam o resultado original no backend
+export const generateIdempotencyKey = (): string =>
+  `${Date.now().toString(36)}-${Math.random().toString(36).slice(2, 12)}`;
+
+// Chave de idempotência já usada com outros dados (HTTP 409)
+export class IdempotencyConflictError extends Error {
+  constructor(message: string) {
+    super(message);
+    this.name = 'IdempotencyConflictError';
+    // Mantém `instanceof` quando a classe é transpilada para ES5
+    Object.setPrototypeOf(this, IdempotencyConflictError.prototype);
+  }
+}
+
 class ApiService {
   private client: AxiosInstance;
 
@@ -62,6 +77,10 @@ class ApiService {
             throw new Error('Muitas requisições. Tente novamente mais tarde.');
           } else if (status >= 500) {
             throw new Error('Erro no servidor. Tente novamente mais tarde.');
+          } else if (status === 409) {
+            throw new IdempotencyConflictError(
+              'Transação já enviada com outros dados. Envie novamente.'
+            );
           } else if (status === 400) {
             const data: any = error.response.data;
             throw new Error(data.detail || 'Dados inválidos');
@@ -74,16 +93,22 @@ class ApiService {
     );
   }
 
+  // A mesma chave deve ser reenviada em cada nova tentativa da transação
   async classifyTransaction(
-    data: ClassificationRequest
+    data: ClassificationRequest,
+    idempotencyKey: string
   ): Promise<ClassificationResponse> {
     try {
       const response = await this.client.post<ClassificationResponse>(
         '/api/v1/classify',
-        data
+        data,
+        { headers: { 'Idempotency-Key': idempotencyKey } }
       );
       return response.data;
     } catch (error: any) {
+      if (error instanceof IdempotencyConflictError) {
+        throw error;
+      }
       throw new Error(error.message || 'Erro ao classificar transação');
     }
   }
@@ -0,0 +1,210 @@
+"""
+Amostragem estratificada de transações do creditcard.csv, com memória constante
+
+Lê o CSV em blocos e mantém um reservatório por classe (Algorithm R), então
+a memória depende apenas do tamanho da amostra, não do arquivo. Com a mesma
+semente, o resultado é sempre o mesmo.
+
+Gera corpora para testes de carga em dois formatos:
+
+- NDJSON: um registro por linha, no formato do dataset (Time, V1..V28, Amount,
+  Class), que pode ser enviado diretamente para /predict
+- Arrays binários: X (.npy, float64, colunas do dataset sem Class) e y (.npy,
+  int8), que podem ser abertos com np.load(..., mmap_mode='r')
+
+Exemplos:
+
+    # 1M transações com a proporção de fraude real do dataset
+    python sample_transactions.py --size 1000000 --output data/corpus_1m
+
+    # 100k transações com 5% de fraude
+    python sample_transactions.py --size 100000 --fraud-ratio 0.05 --output data/corpus_5pct
+
+Se uma classe tiver menos linhas do que o pedido (ex: 1M linhas com 492
+fraudes), todas as linhas da classe são repetidas o mesmo número de vezes e
+o restante é sorteado sem reposição.
+"""
+import argparse
+import json
+import os
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+CSV_FILE_PATH = os.path.join('data', 'creditcard.csv')
+CHUNK_SIZE = 50000
+LABEL_COLUMN = 'Class'
+
+class Reservoir:
+    """Reservatório de tamanho fixo (Algorithm R), atualizado por blocos"""
+
+    def __init__(self, capacity: int, n_columns: int, rng: np.random.Generator):
+        self.capacity = capacity
+        # Alocação cresce com as linhas vistas, até a capacidade
+        self.rows = np.empty((min(capacity, CHUNK_SIZE), n_columns), dtype=np.float64)
+        self.seen = 0
+        self.rng = rng
+
+    def update(self, chunk: np.ndarray):
+        # Primeiras linhas preenchem o reservatório diretamente
+        fill = min(max(self.capacity - self.seen, 0), len(chunk))
+        if fill:
+            if self.seen + fill > len(self.rows):
+                grown = np.empty((min(self.capacity, max(2 * len(self.rows), self.seen + fill)), self.rows.shape[1]))
+                grown[:self.seen] = self.rows[:self.seen]
+                self.rows = grown
+            self.rows[self.seen:self.seen + fill] = chunk[:fill]
+
+        rest = chunk[fill:]
+        if len(rest):
+            # Linha de posição t (1-based) substitui um item com probabilidade capacity/t
+            positions = self.seen + fill + np.arange(1, len(rest) + 1)
+            slots = (self.rng.random(len(rest)) * positions).astype(np.int64)
+            keep = slots < self.capacity
+            slots, replacements = slots[keep], rest[keep]
+            # Slot repetido no bloco: vale a última linha (ordem sequencial)
+            _, last = np.unique(slots[::-1], return_index=True)
+            last = len(slots) - 1 - last
+            self.rows[slots[last]] = replacements[last]
+
+        self.seen += len(chunk)
+
+    def sample(self) -> np.ndarray:
+        return self.rows[:min(self.seen, self.capacity)]
+
+def draw(n_rows: int, size: int, rng: np.random.Generator) -> np.ndarray:
+    """Índices de `size` linhas entre `n_rows`; repete todas as linhas se faltarem"""
+    if size <= n_rows:
+        return rng.choice(n_rows, size, replace=False)
+    repeats, remainder = divmod(size, n_rows)
+    return np.concatenate([np.tile(np.arange(n_rows), repeats), rng.choice(n_rows, remainder, replace=False)])
+
+def stratified_sample(
+    csv_path: str,
+    size: int,
+    fraud_ratio: Optional[float] = None,
+    seed: int = 42,
+    chunk_size: int = CHUNK_SIZE,
+    classes=(0, 1),
+):
+    """
+    Amostra estratificada por Class em uma única passada pelo CSV.
+    Sem `fraud_ratio`, usa a proporção observada no arquivo; nesse caso os
+    reservatórios comportam `size` linhas por classe, e a divisão final é
+    feita depois da leitura (subamostra uniforme de amostra uniforme).
+    Retorna (colunas, X, y, contagens por classe no arquivo).
+    """
+    rng = np.random.default_rng(seed)
+    reservoirs: Dict[int, Reservoir] = {}
+    columns = None
+
+    for chunk in pd.read_csv(csv_path, chunksize=chunk_size):
+        if columns is None:
+            columns = [c for c in chunk.columns if c != LABEL_COLUMN]
+            targets = class_targets(size, fraud_ratio)
+            reservoirs = {
+                c: Reservoir(targets[c] if targets else size, len(columns), rng)
+                for c in classes
+            }
+        labels = chunk[LABEL_COLUMN].to_numpy()
+        values = chunk[columns].to_numpy(dtype=np.float64)
+        for c, reservoir in reservoirs.items():
+            reservoir.update(values[labels == c])
+
+    if columns is None:
+        raise ValueError(f"Arquivo vazio: {csv_path}")
+
+    seen = {c: reservoir.seen for c, reservoir in reservoirs.items()}
+    total = sum(seen.values())
+    if fraud_ratio is None:
+        fraud_ratio = seen[1] / total if total else 0.0
+    targets = class_targets(size, fraud_ratio)
+
+    # Posições embaralhadas no corpus, para intercalar as classes
+    positions = rng.permutation(size)
+    X = np.empty((size, len(columns)), dtype=np.float64)
+    y = np.empty(size, dtype=np.int8)
+    offset = 0
+    for c, reservoir in reservoirs.items():
+        if targets[c] == 0:
+            continue
+        if reservoir.seen == 0:
+            raise ValueError(f"Nenhuma transação da classe {c} em {csv_path}")
+        if targets[c] > reservoir.seen:
+            print(f"Aviso: classe {c} tem {reservoir.seen} linhas; repetindo para chegar a {targets[c]}")
+        sample = reservoir.sample()
+        indices = draw(len(sample), targets[c], rng)
+        for start in range(0, len(indices), chunk_size):
+            batch = indices[start:start + chunk_size]
+            X[positions[offset + start:offset + start + len(batch)]] = sample[batch]
+        y[positions[offset:offset + targets[c]]] = c
+        offset += targets[c]
+
+    return columns, X, y, seen
+
+def class_targets(size: int, fraud_ratio: Optional[float]) -> Optional[Dict[int, int]]:
+    if fraud_ratio is None:
+        return None
+    frauds = int(round(size * fraud_ratio))
+    return {0: size - frauds, 1: frauds}
+
+def write_ndjson(path: str, columns, X: np.ndarray, y: np.ndarray, batch_size: int = 10000):
+    """Um registro JSON por linha, escrito em lotes"""
+    with open(path, 'w') as f:
+        for start in range(0, len(y), batch_size):
+            lines = [
+                json.dumps({**dict(zip(columns, row.tolist())), LABEL_COLUMN: int(label)})
+                for row, label in zip(X[start:start + batch_size], y[start:start + batch_size])
+            ]
+            f.write('\n'.join(lines) + '\n')
+
+def write_arrays(prefix: str, columns, X: np.ndarray, y: np.ndarray, metadata: Dict):
+    np.save(f"{prefix}.X.npy", X)
+    np.save(f"{prefix}.y.npy", y)
+    with open(f"{prefix}.meta.json", 'w') as f:
+        json.dump({'columns': columns, **metadata}, f, indent=2)
+
+def main():
+    parser = argparse.ArgumentParser(description="Amostragem estratificada do creditcard.csv para testes de carga")
+    parser.add_argument('--input', default=CSV_FILE_PATH)
+    parser.add_argument('--size', type=int, default=100000, help="Número de transações no corpus")
+    parser.add_argument('--fraud-ratio', type=float, default=None,
+                        help="Proporção de fraudes (padrão: a mesma do arquivo)")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+    parser.add_argument('--output', default=os.path.join('data', 'corpus'),
+                        help="Prefixo dos arquivos gerados (.ndjson, .X.npy, .y.npy, .meta.json)")
+    parser.add_argument('--format', choices=['ndjson', 'arrays', 'both'], default='both')
+    args = parser.parse_args()
+
+    if args.fraud_ratio is not None and not 0 <= args.fraud_ratio <= 1:
+        parser.error("--fraud-ratio deve estar entre 0 e 1")
+    if not os.path.exists(args.input):
+        print(f"Erro: Arquivo não encontrado em {args.input}")
+        print("Por favor, certifique-se que o 'creditcard.csv' está na pasta 'data'.")
+        return
+
+    print(f"Amostrando {args.size} transações de {args.input} (seed={args.seed})...")
+    columns, X, y, seen = stratified_sample(
+        args.input, args.size, args.fraud_ratio, args.seed, args.chunk_size
+    )
+
+    output_dir = os.path.dirname(args.output)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    if args.format in ('ndjson', 'both'):
+        write_ndjson(f"{args.output}.ndjson", columns, X, y)
+    if args.format in ('arrays', 'both'):
+        write_arrays(args.output, columns, X, y, {
+            'size': int(len(y)),
+            'frauds': int(y.sum()),
+            'fraud_ratio': float(y.mean()) if len(y) else 0.0,
+            'seed': args.seed,
+            'source_counts': {str(c): n for c, n in seen.items()},
+        })
+
+    print(f"Sucesso! {len(y)} transações ({int(y.sum())} fraudes) salvas com prefixo {args.output}")
+
+if __name__ == "__main__":
+    main()